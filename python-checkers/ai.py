@@ -1,79 +1,399 @@
-from board import Board
-from copy import deepcopy
 from random import choice
+from time import perf_counter, time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from bitboard import BitBoard
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from zobrist import get_turn_hash
+from search_stats import SearchStats
+from tablebase import open_tablebase, WIN, DRAW
+from opening_book import open_opening_book
+from evaluation import KING_MOBILITY_VALUE
+
+# Scores are kept between -INFINITY and INFINITY.
+INFINITY = 10000
+
+# Score of a won game, well above any score of evaluation.py. Positions found in the endgame tablebase score less the more moves the win takes.
+# A side with no moves left has lost, so it scores -WIN_SCORE.
+WIN_SCORE = 9999
+
+# Deepest search get_move() tries when it is given a time budget instead of a depth.
+MAX_DEPTH = 64
+
+# How many positions are searched between checks of the time budget.
+TIME_CHECK_INTERVAL = 1024
+
+# Shallower searches finish faster than the time it takes to send them to other processes, so they always run on this one.
+PARALLEL_MIN_DEPTH = 4
+
+# Seconds between checks of the time budget while waiting for other processes.
+PARALLEL_CHECK_INTERVAL = 0.05
+
+class SearchStopped(Exception):
+	# Raised inside the search when the time budget given to get_move() runs out or the search is cancelled.
+	pass
 
 class AI:
-	def __init__(self, color):
+	def __init__(self, color, depth=3, table_size_mb=16, workers=1, use_tablebase=True, use_book=True):
 		# 'color' is the color this AI will play with (B or W)
+		# 'depth' is how many moves ahead (counting both players) the AI looks.
+		# 'table_size_mb' caps the memory used to remember positions that were already searched (by each process).
+		# 'workers' is how many processes search the moves on the root of the search at the same time.
+		# 'use_tablebase' makes the AI look up positions with few pieces in the endgame tablebase, if tablebase.py generated one.
+		# 'use_book' makes the AI play the moves of the opening book, if opening_book.py built one. It's only opened when first needed.
 		self.color = color
-	
+		self.depth = depth
+		self.table_size_mb = table_size_mb
+		self.table = TranspositionTable(table_size_mb)
+		self.workers = workers
+		self.use_tablebase = use_tablebase
+		self.use_book = use_book
+		self.tablebase = open_tablebase() if use_tablebase else None
+		self.tablebase_pieces = 0 if self.tablebase is None else self.tablebase.get_max_pieces() # Positions with more pieces aren't looked up.
+		self.pool = None # Processes of parallel searches, started right away when there's more than one worker.
+		self.pool_stop_event = None # Set to stop the searches running on the pool.
+		self.pool_warm_up = [] # Futures that finish once each process of the pool has started.
+		self.deadline = None # perf_counter() value at which the current search must stop, or None if it has no time limit.
+		self.stop_event = None # threading.Event that cancels the current search when set, or None.
+		self.nodes = 0 # Positions searched, used to check the time budget only every so often.
+		self.leaf_evaluations = 0 # The counters below are only kept for the statistics of get_move_with_stats().
+		self.cutoffs = 0
+		self.table_cutoffs = 0
+		self.tablebase_hits = 0
+		self.profiler = None # SearchProfiler timing parts of the search, or None.
+		self.ponder_results = {} # (depth, best moves, seconds) found by ponder() for each position it searched, by (white, black, kings).
+
+		if workers > 1:
+			self.start_pool()
+
+	def get_table(self):
+		return self.table
+
+	def set_profiler(self, profiler):
+		# Receives a SearchProfiler that times move generation, evaluation and board copying in the next searches, or None to stop.
+		# The timed functions replace the methods of this instance and of the searched bitboard, so searches without it cost nothing more.
+		self.__dict__.pop("get_value", None)
+		self.profiler = profiler
+
+		if profiler is not None:
+			self.get_value = profiler.wrap("evaluation", self.get_value)
+
+	def should_stop(self):
+		# Returns True if the time budget ran out or the search was cancelled.
+		return (self.deadline is not None and perf_counter() >= self.deadline) or (self.stop_event is not None and self.stop_event.is_set())
+
+	def start_pool(self):
+		# Starts the processes of parallel searches. Starting one takes longer than a short search,
+		# so they start in the background now instead of during the first search that uses them.
+		context = get_context("spawn")
+		self.pool_stop_event = context.Event()
+		self.pool = ProcessPoolExecutor(self.workers, context, init_search_process, (self.color, self.table_size_mb, self.use_tablebase, self.pool_stop_event))
+		# Every task is sent before any process is up, so each one starts its own process.
+		self.pool_warm_up = [self.pool.submit(warm_up_process) for _ in range(self.workers)]
+
+	def close(self):
+		# Stops and shuts down the processes used by parallel searches, if any.
+		if self.pool is not None:
+			self.pool_stop_event.set()
+			self.pool.shutdown(wait=False, cancel_futures=True)
+			self.pool = None
+
 
-	def minimax(self, current_board, is_maximizing, depth, turn):
+	def minimax(self, current_board, is_maximizing, depth, turn, alpha=-INFINITY, beta=INFINITY):
 		# Tries to find recursively the best value depending on which player is passed as an argument to the function
-		if depth == 0 or current_board.get_winner() is not None:
-			return self.get_value(current_board)
-		
+		# current_board is a BitBoard shared by the whole search: every move is made on it and unmade once its subtree is searched.
+		# Branches that can't change the result, i.e. when alpha reaches beta, are skipped (alpha-beta pruning).
+		self.nodes += 1
+
+		if self.nodes % TIME_CHECK_INTERVAL == 0 and self.should_stop():
+			raise SearchStopped()
+
+		if (current_board.white | current_board.black).bit_count() <= self.tablebase_pieces:
+			# The tablebase knows the result of perfect play from here, so there's nothing to search.
+			entry = self.tablebase.probe(current_board, turn)
+
+			if entry is not None:
+				self.tablebase_hits += 1
+				return self.get_tablebase_value(entry, turn)
+
+		# A side left without pieces or moves is found below, when it has no moves to search.
+		if depth == 0:
+			self.leaf_evaluations += 1
+			return self.get_value(current_board, turn)
+
+		# Positions reached through different move orders are looked up in the transposition table.
+		key = get_turn_hash(current_board.get_hash(), turn)
+		entry = self.table.probe(key)
+		table_move = None
+
+		if entry is not None:
+			entry_depth, bound, score, table_move = entry
+
+			# Only searches of the same depth are reused, so scores are the same plain minimax gives at this depth
+			# and the choice between equally good moves in get_move() isn't affected.
+			if entry_depth == depth:
+				if bound == EXACT or (bound == LOWER_BOUND and score >= beta) or (bound == UPPER_BOUND and score <= alpha):
+					self.table_cutoffs += 1
+					return score
+
+		original_alpha = alpha
+		original_beta = beta
 		next_turn = 'B' if turn == 'W' else 'W'
-		board_color_up = current_board.get_color_up()
-		current_pieces = current_board.get_pieces()
-		piece_moves = list(map(lambda piece: piece.get_moves(current_board) if piece.get_color() == turn else False, current_pieces))
+		moves = current_board.get_legal_moves(turn)
+
+		# Children of a node at depth 1 are leaves, so ordering them there wouldn't pay off.
+		if depth > 1:
+			moves = self.order_moves(current_board, moves, table_move)
+
+		best_move = None
 
 		if is_maximizing:
 			# A max player will attempt to get the highest value possible.
-			maximum = -999
-			for index, moves in enumerate(piece_moves):
-				if moves == False:
-					continue
-
-				for move in moves:
-					aux_board = Board(deepcopy(current_pieces), board_color_up)
-					aux_board.move_piece(index, int(move["position"]))
-					maximum = max(self.minimax(aux_board, False, depth - 1, next_turn), maximum)
-				
-			return maximum
+			maximum = -WIN_SCORE
+			for move in moves:
+				records = current_board.make_legal_move(move)
+				value = self.minimax(current_board, False, depth - 1, next_turn, alpha, beta)
+				current_board.unmake_legal_move(records)
+
+				if value > maximum:
+					maximum = value
+					best_move = move
+
+				alpha = max(alpha, value)
+				if alpha >= beta:
+					self.cutoffs += 1
+					break
+
+			result = maximum
 		else:
 			# A min player will attempt to get the lowest value possible.
-			minimum = 999
-			for index, moves in enumerate(piece_moves):
-				if moves == False:
-					continue
-
-				for move in moves:
-					aux_board = Board(deepcopy(current_pieces), board_color_up)
-					aux_board.move_piece(index, int(move["position"]))
-					minimum = min(self.minimax(aux_board, True, depth - 1, next_turn), minimum)
-				
-			return minimum
-	
-
-	def get_move(self, current_board):
-		# Receives a Board object, returns the move it finds best suited.
-		board_color_up = current_board.get_color_up()
-		current_pieces = current_board.get_pieces()
-		next_turn = "W" if self.color == "B" else "B"
-		player_pieces = list(map(lambda piece: piece if piece.get_color() == self.color else False, current_pieces))
-		possible_moves = []
-		move_scores = []
+			minimum = WIN_SCORE
+			for move in moves:
+				records = current_board.make_legal_move(move)
+				value = self.minimax(current_board, True, depth - 1, next_turn, alpha, beta)
+				current_board.unmake_legal_move(records)
 
-		for index, piece in enumerate(player_pieces):
-			if piece == False:
-				continue
-			
-			for move in piece.get_moves(current_board):
-				# The value of the key "piece" is the index of the piece on player_pieces that can make the move assigned on the key "move".
-				possible_moves.append({"piece": index, "move": move})
-		
-		# If any jump move is available, only jump moves can be made (checkers rule).
-		jump_moves = list(filter(lambda move: move["move"]["eats_piece"] == True, possible_moves))
+				if value < minimum:
+					minimum = value
+					best_move = move
 
-		if len(jump_moves) != 0:
-			possible_moves = jump_moves
+				beta = min(beta, value)
+				if alpha >= beta:
+					self.cutoffs += 1
+					break
 
-		# Calls minimax for all possible moves and stores the moves with higher values.
-		for move in possible_moves:
-			aux_board = Board(deepcopy(current_pieces), board_color_up)
-			aux_board.move_piece(move["piece"], int(move["move"]["position"]))
-			move_scores.append(self.minimax(aux_board, False, 2, next_turn))
+			result = minimum
+
+		if result <= original_alpha:
+			bound = UPPER_BOUND
+		elif result >= original_beta:
+			bound = LOWER_BOUND
+		else:
+			bound = EXACT
+
+		self.table.store(key, depth, bound, result, best_move)
+		return result
+
+
+	def order_moves(self, board, moves, best_move):
+		# Sorts moves so the ones most likely to be good are searched first, which makes alpha-beta prune more.
+		# Jumps that eat the most pieces come first, then moves that crown a king, then the best move stored for this position by a previous search.
+		# The transposition table only keeps where a move starts and ends, so that's what's compared to best_move.
+		best_from, best_to = (None, None) if best_move is None else best_move[:2]
+		return sorted(moves, key=lambda move: (move[2], len(move[3]), board.is_promotion(move[0], move[1]), move[0] == best_from and move[1] == best_to), reverse=True)
+
+
+	def get_move(self, current_board, time_ms=None, stop_event=None):
+		# Receives a Board object, returns the move it finds best suited, with the same keys as the moves of Board.legal_moves().
+		# See get_move_with_stats() for the other arguments.
+		return self.get_move_with_stats(current_board, time_ms, stop_event)[0]
+
+
+	def get_move_with_stats(self, current_board, time_ms=None, stop_event=None):
+		# Same as get_move(), but returns a (move, SearchStats) tuple describing the search.
+		# Positions in the opening book are answered with one of its moves, without searching.
+		if self.use_book:
+			book = open_opening_book()
+			book_moves = [] if book is None else book.get_moves(current_board.get_bitboard(), self.color)
+
+			if len(book_moves) != 0:
+				stats = SearchStats()
+				stats.book_move = True
+				return (self.get_move_dict(choice(book_moves)), stats)
+
+		best_moves, stats = self.get_best_moves(current_board, time_ms, stop_event)
+
+		if best_moves is None:
+			return (None, stats)
+
+		# Chooses a random move just in case there are more than one "good" move, then returns it properly.
+		return (self.get_move_dict(choice(best_moves)), stats)
+
+
+	def get_move_dict(self, move):
+		# Receives a move tuple of BitBoard.get_legal_moves(), returns it with the keys of Board.legal_moves().
+		return {"position_to": move[1], "position_from": move[0], "eats_piece": move[2], "path": move[3]}
+
+
+	def get_best_moves(self, current_board, time_ms=None, stop_event=None):
+		# Returns a (moves, SearchStats) tuple with every move of the Board that got the best score, as BitBoard.get_legal_moves() tuples.
+		# The search is repeated with increasing depth so each iteration can order its moves using the results of the previous one.
+		# If time_ms is given, the search keeps going deeper than self.depth until that many milliseconds pass,
+		# and the moves found by the last depth that was searched completely are used.
+		# If stop_event (a threading.Event) is set while searching, the search is cancelled and the moves are None.
+		# The moves are also None if this AI's color has no legal moves, so the game is already lost.
+		# The search runs on a single copy of the board's bitboard, so the Board itself is never touched.
+		if self.pool is not None:
+			# The time budget only starts counting once every process of the pool is ready.
+			wait(self.pool_warm_up)
+
+		start_time = perf_counter()
+		stats = SearchStats()
+		self.nodes = 0
+		self.leaf_evaluations = 0
+		self.cutoffs = 0
+		self.table_cutoffs = 0
+		self.tablebase_hits = 0
+		self.table.reset_stats()
+
+		if self.profiler is None:
+			bitboard = current_board.get_bitboard().copy()
+		else:
+			self.profiler.start()
+			bitboard = self.profiler.instrument_board(self.profiler.copy_board(current_board.get_bitboard()))
+
+		possible_moves = bitboard.get_legal_moves(self.color)
+		self.table.new_search()
+		self.deadline = None # The first depth is always searched completely, so there's a move to return.
+		self.stop_event = stop_event
+		max_depth = self.depth if time_ms is None else MAX_DEPTH
+		best_moves = possible_moves if len(possible_moves) == 1 else []
+		first_depth = 1
+		pondered = self.ponder_results.get((bitboard.white, bitboard.black, bitboard.kings))
+		self.ponder_results = {}
+
+		if pondered is not None and len(possible_moves) > 1:
+			# The position was searched while pondering, so the search carries on from the depth it reached there.
+			# With a time budget, the time spent pondering it counts, so a position pondered long enough is answered at once.
+			stats.pondered_depth, best_moves, pondered_seconds = pondered
+			stats.add_depth(stats.pondered_depth, pondered_seconds, 0)
+			first_depth = stats.pondered_depth + 1
+
+			if time_ms is not None:
+				time_ms -= pondered_seconds * 1000
+				self.deadline = start_time + time_ms / 1000
+
+				if time_ms <= 0:
+					max_depth = 0
+
+		for depth in range(first_depth, max_depth + 1):
+			if len(possible_moves) <= 1:
+				# There's nothing to choose from.
+				break
+
+			# Moves that were best in the previous iteration are searched first.
+			possible_moves = best_moves + [move for move in possible_moves if move not in best_moves]
+
+			depth_start_time = perf_counter()
+			depth_start_nodes = self.nodes
+
+			try:
+				best_moves = self.search_root(bitboard, possible_moves, depth)
+			except SearchStopped:
+				break
+
+			stats.add_depth(depth, perf_counter() - depth_start_time, self.nodes - depth_start_nodes)
+
+			if time_ms is not None:
+				self.deadline = start_time + time_ms / 1000
+
+				if perf_counter() >= self.deadline:
+					break
+
+		self.deadline = None
+		self.stop_event = None
+
+		if self.profiler is not None:
+			self.profiler.stop()
+
+		stats.nodes = self.nodes
+		stats.leaf_evaluations = self.leaf_evaluations
+		stats.cutoffs = self.cutoffs
+		stats.table_cutoffs = self.table_cutoffs
+		stats.tablebase_hits = self.tablebase_hits
+		stats.table_probes = self.table.probes
+		stats.table_hits = self.table.hits
+		stats.time = perf_counter() - start_time
+
+		if (stop_event is not None and stop_event.is_set()) or len(best_moves) == 0:
+			return (None, stats)
+
+		return (best_moves, stats)
+
+
+	def ponder(self, bitboard, time_ms=None, stop_event=None):
+		# Searches the positions the opponent's replies lead to on the BitBoard, where it's the opponent's turn, while the opponent thinks.
+		# Every reply is searched one depth deeper at a time, the expected one first, until stop_event is set or each has been searched
+		# as deep as get_move() would (to self.depth, or for time_ms milliseconds). The results are kept in self.ponder_results, so
+		# get_move() answers the reply that's actually played at once or carries on from there, with the transposition table already warm.
+		opponent = "W" if self.color == "B" else "B"
+		book = open_opening_book() if self.use_book else None
+		entry = self.table.probe(get_turn_hash(bitboard.get_hash(), opponent))
+		replies = self.order_moves(bitboard, bitboard.get_legal_moves(opponent), None if entry is None else entry[3])
+		max_depth = self.depth if time_ms is None else MAX_DEPTH
+		lines = [] # One dict per reply worth searching.
+		self.ponder_results = {}
+		self.nodes = 0
+		self.table.new_search()
+		self.deadline = None
+		self.stop_event = stop_event
+
+		for reply in replies:
+			records = bitboard.make_legal_move(reply)
+			moves = bitboard.get_legal_moves(self.color)
+
+			# Forced moves and positions of the opening book are answered at once anyway.
+			if len(moves) > 1 and (book is None or len(book.get_moves(bitboard, self.color)) == 0):
+				lines.append({"reply": reply, "key": (bitboard.white, bitboard.black, bitboard.kings), "moves": moves, "best_moves": [], "depth": 0, "seconds": 0})
+
+			bitboard.unmake_legal_move(records)
+
+		try:
+			while True:
+				pending = [line for line in lines if line["depth"] < max_depth and (time_ms is None or line["seconds"] * 1000 < time_ms)]
+
+				if len(pending) == 0:
+					break
+
+				depth = min(line["depth"] for line in pending) + 1
+
+				for line in pending:
+					if line["depth"] + 1 != depth:
+						continue
+
+					records = bitboard.make_legal_move(line["reply"])
+					start_time = perf_counter()
+
+					try:
+						possible_moves = line["best_moves"] + [move for move in line["moves"] if move not in line["best_moves"]]
+						line["best_moves"] = self.search_root(bitboard, possible_moves, depth)
+						line["depth"] = depth
+						self.ponder_results[line["key"]] = (depth, line["best_moves"], line["seconds"] + perf_counter() - start_time)
+					finally:
+						line["seconds"] += perf_counter() - start_time
+						bitboard.unmake_legal_move(records)
+		except SearchStopped:
+			pass
+		finally:
+			self.stop_event = None
+
+
+	def search_root(self, bitboard, possible_moves, depth):
+		# Searches every move that can be made on the bitboard to the given depth, returns the ones with the best score.
+		if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH:
+			move_scores = self.score_moves_in_parallel(bitboard, possible_moves, depth)
+		else:
+			move_scores = self.score_moves(bitboard, possible_moves, depth)
 
 		best_score = max(move_scores)
 		best_moves = []
@@ -81,28 +401,145 @@ class AI:
 		for index, move in enumerate(possible_moves):
 			if move_scores[index] == best_score:
 				best_moves.append(move)
-		
-		# Chooses a random move just in case there are more than one "good" move, then returns it properly.
-		move_chosen = choice(best_moves)
-		return {"position_to": move_chosen["move"]["position"], "position_from": player_pieces[move_chosen["piece"]].get_position()}
 
+		return best_moves
 
-	def get_value(self, board):
-		# Receives a Board object, returns a value depending on which player won or which player has the most pieces on board.
-		# The value is higher if the board benefits this AI and lower otherwise.
-		board_pieces = board.get_pieces()
 
-		if board.get_winner() is not None:
-			if board_pieces[0].get_color() == self.color:
-				return 2
+	def score_moves(self, bitboard, possible_moves, depth):
+		# Returns the score of each move, in the same order. Only the scores of the best moves are exact.
+		next_turn = "W" if self.color == "B" else "B"
+		move_scores = []
+		best_score = -INFINITY
+
+		# Calls minimax for all possible moves and stores the moves with higher values.
+		# Searching with alpha one below the best score so far gives the exact score of any move that ties with it,
+		# so every "good" move is still found even though worse ones are pruned.
+		for move in possible_moves:
+			records = bitboard.make_legal_move(move)
+			score = self.minimax(bitboard, False, depth - 1, next_turn, best_score - 1, INFINITY)
+			bitboard.unmake_legal_move(records)
+
+			move_scores.append(score)
+			best_score = max(best_score, score)
+
+		return move_scores
+
+
+	def score_moves_in_parallel(self, bitboard, possible_moves, depth):
+		# Same as score_moves(), but each move is searched by one of the processes of the pool and all scores are exact.
+		# Boards are sent as a tuple of integers and every process keeps its own transposition table between searches.
+		if self.pool is None:
+			self.start_pool()
+
+		self.pool_stop_event.clear()
+		position = (bitboard.white, bitboard.black, bitboard.kings, bitboard.color_up)
+		# The deadline is sent as a time() value, since perf_counter() values can't be compared between processes.
+		deadline = None if self.deadline is None else time() + self.deadline - perf_counter()
+		futures = [self.pool.submit(score_move_in_process, position, move, depth, deadline, self.table.generation) for move in possible_moves]
+		pending = futures
+
+		while len(pending) != 0:
+			_, pending = wait(pending, PARALLEL_CHECK_INTERVAL)
+
+			if self.should_stop():
+				# Moves no process has started are dropped and the running searches stop at their next check of the time budget.
+				# They're waited for, so none of them is still running when the next search clears the event.
+				for future in pending:
+					future.cancel()
+
+				self.pool_stop_event.set()
+				wait(pending)
+				raise SearchStopped()
+
+		move_scores = []
+
+		# Each process also sends the counters of its search, which are added to this one's.
+		for future in futures:
+			score, nodes, leaf_evaluations, cutoffs, table_cutoffs, tablebase_hits, table_probes, table_hits = future.result()
+			move_scores.append(score)
+			self.nodes += nodes
+			self.leaf_evaluations += leaf_evaluations
+			self.cutoffs += cutoffs
+			self.table_cutoffs += table_cutoffs
+			self.tablebase_hits += tablebase_hits
+			self.table.probes += table_probes
+			self.table.hits += table_hits
+
+		if None in move_scores:
+			# A process ran out of time before this one noticed it.
+			raise SearchStopped()
+
+		return move_scores
+
+
+	def score_move(self, bitboard, move, depth, time_left=None):
+		# Returns the exact score of making the move on the bitboard, searched to the given depth.
+		# Returns None if time_left seconds pass or the search is cancelled before it's done.
+		next_turn = "W" if self.color == "B" else "B"
+		self.deadline = None if time_left is None else perf_counter() + time_left
+		records = bitboard.make_legal_move(move)
+
+		try:
+			return self.minimax(bitboard, False, depth - 1, next_turn)
+		except SearchStopped:
+			return None
+		finally:
+			bitboard.unmake_legal_move(records)
+			self.deadline = None
+
+
+	def get_value(self, board, turn=None):
+		# Receives a BitBoard object and the color to move, returns a value depending on which player won or on the material and position of each side.
+		# The value is higher if the board benefits this AI and lower otherwise. The board keeps its counts and score up to date,
+		# so only the mobility of the kings is counted here, which costs nothing while there are no kings.
+		winner = board.get_winner(turn)
+
+		if winner is not None:
+			if winner == self.color:
+				return WIN_SCORE
 			else:
-				return -2
-		
-		total_pieces = len(board_pieces)
-		player_pieces = len(list(filter(lambda piece: piece.get_color() == self.color, board_pieces)))
-		opponent_pieces = total_pieces - player_pieces
+				return -WIN_SCORE
+
+		score = board.get_score() + KING_MOBILITY_VALUE * board.get_king_mobility()
+		return score if self.color == "W" else -score
+
 
-		if player_pieces == opponent_pieces:
+	def get_tablebase_value(self, entry, turn):
+		# Receives a (result, moves) tuple from Tablebase.probe() for the side to move, returns its value for this AI.
+		# Wins that take fewer moves are worth more, so the AI goes for the quickest win and puts off losing for as long as it can.
+		result, moves = entry
+
+		if result == DRAW:
 			return 0
-		
-		return 1 if player_pieces > opponent_pieces else -1
\ No newline at end of file
+
+		value = WIN_SCORE - moves if result == WIN else moves - WIN_SCORE
+		return value if turn == self.color else -value
+
+
+# AI used by each process of a parallel search. It's created by init_search_process() when the process starts.
+process_ai = None
+
+def init_search_process(color, table_size_mb, use_tablebase, stop_event):
+	global process_ai
+	process_ai = AI(color, table_size_mb=table_size_mb, use_tablebase=use_tablebase)
+	process_ai.stop_event = stop_event
+
+def warm_up_process():
+	# Does nothing. AI.start_pool() sends it to start the processes of the pool.
+	pass
+
+def score_move_in_process(position, move, depth, deadline, table_generation):
+	# Receives a (white, black, kings, color_up) tuple and a move, returns AI.score_move() for them, stopping at the given time() value
+	# (or never if it's None), followed by the counters of the search: nodes, leaf evaluations, cutoffs, table cutoffs, tablebase hits, table probes and table hits.
+	white, black, kings, color_up = position
+	process_ai.table.generation = table_generation
+	process_ai.nodes = 0
+	process_ai.leaf_evaluations = 0
+	process_ai.cutoffs = 0
+	process_ai.table_cutoffs = 0
+	process_ai.tablebase_hits = 0
+	process_ai.table.reset_stats()
+	time_left = None if deadline is None else deadline - time()
+	score = process_ai.score_move(BitBoard(white, black, kings, color_up), move, depth, time_left)
+	table = process_ai.table
+	return (score, process_ai.nodes, process_ai.leaf_evaluations, process_ai.cutoffs, process_ai.table_cutoffs, process_ai.tablebase_hits, table.probes, table.hits)
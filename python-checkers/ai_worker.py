@@ -0,0 +1,69 @@
+from threading import Thread, Event
+
+class AIWorker:
+    def __init__(self, ai_control):
+        # Runs the searches of an AI instance in a background thread, so the game loop keeps running while the AI thinks.
+        self.ai_control = ai_control
+        self.thread = None
+        self.stop_event = None
+        self.search_id = 0 # Increases with every search started or cancelled, so results of old searches can be told apart.
+        self.pondering = False # True if the thread is pondering instead of searching a move.
+
+    def get_search_id(self):
+        return self.search_id
+
+    def is_busy(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_pondering(self):
+        return self.pondering and self.is_busy()
+
+    def start(self, board, time_ms, on_result):
+        # Starts searching the best move for the given Board. When it's found, on_result(move, search_id) is called from the worker thread.
+        # Returns False without doing anything if a search is already running.
+        if self.is_busy():
+            return False
+
+        self.search_id += 1
+        self.stop_event = Event()
+        self.pondering = False
+        self.thread = Thread(target=self.run, args=(board, time_ms, on_result, self.search_id, self.stop_event), daemon=True)
+        self.thread.start()
+        return True
+
+    def run(self, board, time_ms, on_result, search_id, stop_event):
+        move = self.ai_control.get_move(board, time_ms, stop_event)
+
+        if not stop_event.is_set():
+            on_result(move, search_id)
+
+    def ponder(self, board, time_ms):
+        # Starts AI.ponder() on the position of the given Board, where it's the opponent's turn, until cancel() is called.
+        # The position is copied right away, since the opponent keeps moving on the Board meanwhile. Returns False if it's already pondering.
+        if self.is_pondering():
+            return False
+
+        # A search that just reported its move may still be finishing.
+        if self.thread is not None:
+            self.thread.join()
+
+        self.search_id += 1
+        self.stop_event = Event()
+        self.pondering = True
+        self.thread = Thread(target=self.ai_control.ponder, args=(board.get_bitboard().copy(), time_ms, self.stop_event), daemon=True)
+        self.thread.start()
+        return True
+
+    def cancel(self, timeout=None):
+        # Stops the running search, if any. Its result is never reported and any result already reported becomes outdated.
+        # Waits up to timeout seconds (forever if None) for the worker thread to finish.
+        self.search_id += 1
+
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+        self.pondering = False
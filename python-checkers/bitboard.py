@@ -0,0 +1,388 @@
+from zobrist import PIECE_KEYS, get_kind, get_hash
+from evaluation import PIECE_SQUARE_VALUES
+
+# Bit n of every bitboard represents the dark square at position n (0-31) on the board.
+# Even rows (0, 2, 4, 6) start on column 0 and odd rows start on column 1, just like in Board.get_col_number().
+FULL_BOARD = 0xFFFFFFFF
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+LEFT_EDGE = 0x01010101 # Squares on column 0.
+RIGHT_EDGE = 0x80808080 # Squares on column 7.
+TOP_ROW = 0x0000000F
+BOTTOM_ROW = 0xF0000000
+
+# Sources that are allowed to shift in each direction without wrapping around the board.
+UP_LEFT_EVEN = EVEN_ROWS & ~LEFT_EDGE & FULL_BOARD
+UP_RIGHT_ODD = ODD_ROWS & ~RIGHT_EDGE & FULL_BOARD
+
+def up_left(bb):
+    # Moves every bit of the bitboard one square up and to the left.
+    return ((bb & UP_LEFT_EVEN) >> 5) | ((bb & ODD_ROWS) >> 4)
+
+def up_right(bb):
+    return ((bb & EVEN_ROWS) >> 4) | ((bb & UP_RIGHT_ODD) >> 3)
+
+def down_left(bb):
+    return (((bb & UP_LEFT_EVEN) << 3) | ((bb & ODD_ROWS) << 4)) & FULL_BOARD
+
+def down_right(bb):
+    return (((bb & EVEN_ROWS) << 4) | ((bb & UP_RIGHT_ODD) << 5)) & FULL_BOARD
+
+# Each direction is paired with its opposite, used to find where a move came from given where it lands.
+# The last value tells if the direction goes up the board.
+DIRECTIONS = ((up_left, down_right, True), (up_right, down_left, True), (down_left, up_right, False), (down_right, up_left, False))
+
+# Reversing the bits of a bitboard turns the board around (position n becomes 31 - n), which swaps the direction each color moves to.
+REVERSED_BYTES = [int("{:08b}".format(byte)[::-1], 2) for byte in range(256)]
+
+def rotate(bb):
+    return REVERSED_BYTES[bb & 0xFF] << 24 | REVERSED_BYTES[bb >> 8 & 0xFF] << 16 | REVERSED_BYTES[bb >> 16 & 0xFF] << 8 | REVERSED_BYTES[bb >> 24]
+
+def get_canonical(white, black, kings, color_up, turn):
+    # Returns the position as (ours, theirs, kings) bitboards, where "we" are the side to move, moving up the board.
+    ours, theirs = (white, black) if turn == "W" else (black, white)
+
+    if turn == color_up:
+        return (ours, theirs, kings)
+
+    return (rotate(ours), rotate(theirs), rotate(kings))
+
+def build_square_tables():
+    # Builds the lookup tables below once, by shifting each square's bit in every direction.
+    up_steps = []
+    down_steps = []
+    jumped_squares = []
+
+    for position in range(32):
+        bit = 1 << position
+        steps = []
+
+        for direction, _, _ in DIRECTIONS:
+            neighbor_bit = direction(bit)
+            landing_bit = direction(neighbor_bit)
+            neighbor = neighbor_bit.bit_length() - 1 if neighbor_bit else None
+            landing = landing_bit.bit_length() - 1 if landing_bit else None
+            steps.append((neighbor, landing))
+
+        up_steps.append(tuple(step for step in steps[:2] if step[0] is not None))
+        down_steps.append(tuple(step for step in steps[2:] if step[0] is not None))
+        jumped_squares.append({landing: neighbor for neighbor, landing in steps if landing is not None})
+
+    king_steps = [up_steps[position] + down_steps[position] for position in range(32)]
+    return up_steps, down_steps, king_steps, jumped_squares
+
+# For each position, a tuple of (neighbor, landing) pairs: the square next to it in a direction and the one a jump in that direction lands on.
+# landing is None when a jump would leave the board. Men use the table of the direction their color moves to, kings use both.
+# JUMPED_SQUARES maps each position to a {landing: jumped position} dict of the jumps starting on it.
+UP_STEPS, DOWN_STEPS, KING_STEPS, JUMPED_SQUARES = build_square_tables()
+
+class BitBoard:
+    def __init__(self, white, black, kings, color_up, position_hash=None):
+        # Each argument but color_up is a 32-bit integer with one bit per square.
+        self.white = white
+        self.black = black
+        self.kings = kings
+        self.color_up = color_up
+        self.hash = get_hash(white, black, kings) if position_hash is None else position_hash # Zobrist hash, updated on every move.
+        self.square_values = PIECE_SQUARE_VALUES[color_up]
+        self.counts = [0, 0, 0, 0] # Pieces of each kind, indexed like zobrist.PIECE_KEYS. Updated on every move.
+        self.score = 0 # Sum of the values of every piece (see evaluation.py), white minus black. Updated on every move.
+
+        for color_bits, is_white in ((white, True), (black, False)):
+            while color_bits:
+                bit = color_bits & -color_bits
+                color_bits ^= bit
+                position = bit.bit_length() - 1
+                kind = get_kind(is_white, kings & bit != 0)
+                self.counts[kind] += 1
+                self.score += self.square_values[kind][position]
+
+    @classmethod
+    def from_pieces(cls, pieces, color_up):
+        # Receives a list of Piece objects, returns the equivalent BitBoard.
+        white = black = kings = 0
+
+        for piece in pieces:
+            bit = 1 << piece.get_position()
+
+            if piece.get_color() == "W":
+                white |= bit
+            else:
+                black |= bit
+
+            if piece.is_king():
+                kings |= bit
+
+        return cls(white, black, kings, color_up)
+
+    def copy(self):
+        return BitBoard(self.white, self.black, self.kings, self.color_up, self.hash)
+
+    def get_color_up(self):
+        return self.color_up
+
+    def get_hash(self):
+        return self.hash
+
+    def get_side(self, color):
+        return self.white if color == "W" else self.black
+
+    def get_occupied(self):
+        return self.white | self.black
+
+    def has_piece(self, position):
+        return (self.white | self.black) >> position & 1 == 1
+
+    def get_color(self, position):
+        # Returns the color of the piece on the given position, or None if the square is empty.
+        if self.white >> position & 1:
+            return "W"
+        if self.black >> position & 1:
+            return "B"
+        return None
+
+    def count_pieces(self, color):
+        kind = get_kind(color == "W", False)
+        return self.counts[kind] + self.counts[kind + 1]
+
+    def count_men(self, color):
+        return self.counts[get_kind(color == "W", False)]
+
+    def count_kings(self, color):
+        return self.counts[get_kind(color == "W", True)]
+
+    def get_score(self):
+        # Returns the material and positional score of the board, positive when it favors white.
+        return self.score
+
+    def get_king_mobility(self):
+        # Returns how many more empty squares white's kings can step to than black's, counting each direction of each king.
+        # Counted for all kings at once with shifts, and skipped when there are no kings.
+        if self.kings == 0:
+            return 0
+
+        empty = ~(self.white | self.black) & FULL_BOARD
+        white_kings = self.white & self.kings
+        black_kings = self.black & self.kings
+        mobility = 0
+
+        for direction, _, _ in DIRECTIONS:
+            mobility += (direction(white_kings) & empty).bit_count() - (direction(black_kings) & empty).bit_count()
+
+        return mobility
+
+    def has_moves(self, color):
+        # Returns True if the given color has any legal move, checked for the whole color at once with shifts.
+        own = self.get_side(color)
+        opponent = self.black if color == "W" else self.white
+        empty = ~(self.white | self.black) & FULL_BOARD
+        own_kings = own & self.kings
+        is_up = color == self.color_up
+
+        for direction, _, goes_up in DIRECTIONS:
+            pieces = own if goes_up == is_up else own_kings
+
+            if direction(pieces) & empty or direction(direction(pieces) & opponent) & empty:
+                return True
+
+        return False
+
+    def get_winner(self, turn=None):
+        # Returns the winning color or None if no player has won yet.
+        # If the color to move is given, it also loses when it has no legal moves left.
+        if self.counts[2] + self.counts[3] == 0:
+            return "W"
+        if self.counts[0] + self.counts[1] == 0:
+            return "B"
+        if turn is not None and not self.has_moves(turn):
+            return "B" if turn == "W" else "W"
+        return None
+
+    def get_legal_moves(self, color):
+        # Returns every legal move of the given color as (position_from, position_to, eats_piece, path) tuples,
+        # where path has every position the piece lands on, in order.
+        # If any piece can jump, only jumps can be made (checkers rule). A jump goes on for as long as the piece is able to jump again,
+        # so a multi-jump is a single move. The pieces that can move or jump are found for the whole color at once with shifts.
+        own = self.get_side(color)
+        opponent = self.black if color == "W" else self.white
+        empty = ~(self.white | self.black) & FULL_BOARD
+        own_kings = own & self.kings
+        is_up = color == self.color_up
+        moves = []
+        jumpers = 0
+
+        for direction, opposite, goes_up in DIRECTIONS:
+            pieces = own if goes_up == is_up else own_kings
+            eatable = direction(pieces) & opponent
+
+            if eatable:
+                jumpers |= opposite(opposite(direction(eatable) & empty))
+
+        if jumpers:
+            while jumpers:
+                bit = jumpers & -jumpers
+                jumpers ^= bit
+                position = bit.bit_length() - 1
+                self.add_jump_chains(position, position, (), moves)
+
+            return moves
+
+        for direction, opposite, goes_up in DIRECTIONS:
+            pieces = own if goes_up == is_up else own_kings
+
+            if not pieces:
+                continue
+
+            targets = direction(pieces) & empty
+
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                position_to = bit.bit_length() - 1
+                moves.append((opposite(bit).bit_length() - 1, position_to, False, (position_to,)))
+
+        return moves
+
+    def add_jump_chains(self, position_from, position, path, moves):
+        # Appends to moves every multi-jump the piece on position can finish, given it started on position_from and landed on path.
+        # Each jump is made on the board and unmade after the jumps that follow it are found, so pieces are eaten and crowned as they go.
+        landings = self.get_piece_jumps(position)
+
+        if len(landings) == 0:
+            moves.append((position_from, position, True, path))
+            return
+
+        for landing in landings:
+            record = self.make_move(position, landing)
+            self.add_jump_chains(position_from, landing, path + (landing,), moves)
+            self.unmake_move(record)
+
+    def make_legal_move(self, move):
+        # Makes every jump (or the single step) of a move returned by get_legal_moves().
+        # Returns the records needed by unmake_legal_move() to revert it.
+        position = move[0]
+        records = []
+
+        for landing in move[3]:
+            records.append(self.make_move(position, landing))
+            position = landing
+
+        return records
+
+    def unmake_legal_move(self, records):
+        for record in reversed(records):
+            self.unmake_move(record)
+
+    def get_piece_steps(self, position):
+        # Returns the (neighbor, landing) pairs of the square tables that apply to the piece on position.
+        if self.kings >> position & 1:
+            return KING_STEPS[position]
+
+        is_white = self.white >> position & 1 == 1
+        return UP_STEPS[position] if is_white == (self.color_up == "W") else DOWN_STEPS[position]
+
+    def get_piece_jumps(self, position):
+        # Returns the positions the piece on position can land on by jumping once.
+        occupied = self.white | self.black
+        opponent = self.black if self.white >> position & 1 else self.white
+        return [landing for neighbor, landing in self.get_piece_steps(position)
+                if landing is not None and opponent >> neighbor & 1 and not occupied >> landing & 1]
+
+    def get_piece_moves(self, position):
+        # Returns the moves of the piece on the given position, or an empty list if there is no piece on it.
+        # The piece's neighbors are read from the square tables. If it is able to jump, only its jumps are returned.
+        if not (self.white | self.black) >> position & 1:
+            return []
+
+        jumps = self.get_piece_jumps(position)
+
+        if len(jumps) != 0:
+            return [(position, landing, True) for landing in jumps]
+
+        occupied = self.white | self.black
+        return [(position, neighbor, False) for neighbor, _ in self.get_piece_steps(position) if not occupied >> neighbor & 1]
+
+    def is_promotion(self, position_from, position_to):
+        # Returns True if moving the piece on position_from to position_to turns it into a king.
+        if self.kings >> position_from & 1:
+            return False
+
+        is_white = self.white >> position_from & 1 == 1
+        return (1 << position_to) & (TOP_ROW if (is_white == (self.color_up == "W")) else BOTTOM_ROW) != 0
+
+    def make_move(self, position_from, position_to):
+        # Moves the piece on position_from to position_to, removing the piece it jumps over if any.
+        # Returns a record of what changed, which unmake_move() uses to revert the move exactly.
+        from_bit = 1 << position_from
+        to_bit = 1 << position_to
+        is_white = self.white & from_bit != 0
+        is_king = self.kings & from_bit != 0
+        kind = get_kind(is_white, is_king)
+        old_hash = self.hash
+        old_score = self.score
+        eaten_bit = 0
+        eaten_king = False
+        promoted = False
+
+        eaten_position = JUMPED_SQUARES[position_from].get(position_to)
+
+        if eaten_position is not None:
+            eaten_bit = 1 << eaten_position
+            eaten_king = self.kings & eaten_bit != 0
+            eaten_kind = get_kind(not is_white, eaten_king)
+            self.white &= ~eaten_bit
+            self.black &= ~eaten_bit
+            self.kings &= ~eaten_bit
+            self.hash ^= PIECE_KEYS[eaten_kind][eaten_position]
+            self.counts[eaten_kind] -= 1
+            self.score -= self.square_values[eaten_kind][eaten_position]
+
+        if is_white:
+            self.white ^= from_bit | to_bit
+        else:
+            self.black ^= from_bit | to_bit
+
+        new_kind = kind
+
+        if is_king:
+            self.kings ^= from_bit | to_bit
+        elif to_bit & (TOP_ROW if (is_white == (self.color_up == "W")) else BOTTOM_ROW):
+            # Turn piece into a king if it reaches the other side of the board
+            self.kings |= to_bit
+            promoted = True
+            new_kind = kind + 1
+            self.counts[kind] -= 1
+            self.counts[new_kind] += 1
+
+        self.hash ^= PIECE_KEYS[kind][position_from] ^ PIECE_KEYS[new_kind][position_to]
+        self.score += self.square_values[new_kind][position_to] - self.square_values[kind][position_from]
+
+        return (from_bit, to_bit, is_white, eaten_bit, eaten_king, promoted, old_hash, old_score)
+
+    def unmake_move(self, record):
+        # Receives a record returned by make_move() and puts the board back to how it was before that move.
+        from_bit, to_bit, is_white, eaten_bit, eaten_king, promoted, old_hash, old_score = record
+
+        if is_white:
+            self.white ^= from_bit | to_bit
+            self.black |= eaten_bit
+        else:
+            self.black ^= from_bit | to_bit
+            self.white |= eaten_bit
+
+        if promoted:
+            self.kings &= ~to_bit
+            kind = get_kind(is_white, False)
+            self.counts[kind] += 1
+            self.counts[kind + 1] -= 1
+        elif self.kings & to_bit:
+            self.kings ^= from_bit | to_bit
+
+        if eaten_bit:
+            self.counts[get_kind(not is_white, eaten_king)] += 1
+
+        if eaten_king:
+            self.kings |= eaten_bit
+
+        self.hash = old_hash
+        self.score = old_score
@@ -1,10 +1,33 @@
 from utils import get_position_with_row_col
+from bitboard import BitBoard, JUMPED_SQUARES
+from piece import Piece
+
+def get_start_pieces():
+    # Returns the pieces of a new game: black on positions 0-11 and white on 20-31.
+    pieces = []
+
+    for opponent_piece in range(0, 12):
+        pieces.append(Piece(str(opponent_piece) + 'BN'))
+
+    for player_piece in range(20, 32):
+        pieces.append(Piece(str(player_piece) + 'WN'))
+
+    return pieces
 
 class Board:
     def __init__(self, pieces, color_up):
-        # Example: [Piece('12WND'), Piece('14BNU'), Piece('24WYD')]
+        # Example: [Piece('12WN'), Piece('14BN'), Piece('24WY')]
         self.pieces = pieces
         self.color_up = color_up # Defines which of the colors is moving up.
+        self.bitboard = BitBoard.from_pieces(pieces, color_up) # Kept in sync with self.pieces, used for fast queries and move generation.
+        self.squares = [None] * 32 # Piece on each of the 32 positions (or None), kept in sync with self.pieces.
+        self.indices = [-1] * 32 # Index in self.pieces of the piece on each position (or -1), kept in sync with self.pieces.
+        self.version = 0 # Increases every time a move is made or undone, so anything computed from a position can tell it's outdated.
+        self.listeners = [] # Functions called with what changed every time a move is made or undone (see add_listener()).
+
+        for index, piece in enumerate(pieces):
+            self.squares[piece.get_position()] = piece
+            self.indices[piece.get_position()] = index
     
     def get_color_up(self):
         return self.color_up
@@ -12,18 +35,52 @@ class Board:
     def get_pieces(self):
         return self.pieces
 
+    def get_bitboard(self):
+        return self.bitboard
+
+    def get_version(self):
+        return self.version
+
+    def get_hash(self):
+        # Returns the Zobrist hash of the current position, which move_piece() keeps up to date.
+        return self.bitboard.get_hash()
+
+    def add_listener(self, listener):
+        # Receives a function that's called after every move_piece() and undo_move() with a dict of what changed:
+        # "moved" is a (position_from, position_to) tuple, "captured" the Piece jumped over or None, "promoted" True if the
+        # moving piece was crowned and "undone" True if the change comes from undo_move(), which puts the captured piece back
+        # and turns a promoted piece back into a man.
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify_listeners(self, change):
+        for listener in self.listeners:
+            listener(change)
+
     def get_piece_by_index(self, index):
         return self.pieces[index]
 
-    def has_piece(self, position):
-        # Receives position (e.g.: 28), returns True if there's a piece in that position
-        string_pos = str(position)
+    def get_piece_by_position(self, position):
+        # Receives position (e.g.: 28), returns the Piece in that position or None if it's empty.
+        return self.squares[position]
 
-        for piece in self.pieces:
-            if piece.get_position() == string_pos:
-                return True
+    def get_index_by_position(self, position):
+        # Receives position (e.g.: 28), returns the index of the Piece in that position or -1 if it's empty.
+        # The index of every position is kept up to date by move_piece() and undo_move(), so the list is never searched.
+        return self.indices[position]
 
-        return False
+    def has_piece(self, position):
+        # Receives position (e.g.: 28), returns True if there's a piece in that position
+        return self.bitboard.has_piece(position)
+
+    def legal_moves(self, color):
+        # Receives a color, returns every move it can make as a list of dicts like
+        # {"position_from": 22, "position_to": 8, "eats_piece": True, "path": (15, 8)}, where path has every position landed on.
+        # Jumps are forced and a multi-jump is a single move (see BitBoard.get_legal_moves()).
+        return [{"position_from": position_from, "position_to": position_to, "eats_piece": eats_piece, "path": path}
+                for position_from, position_to, eats_piece, path in self.bitboard.get_legal_moves(color)]
     
     def get_row_number(self, position):
         # Receives position (e.g.: 1), returns the row this position is on the board.
@@ -41,63 +98,32 @@ class Board:
     def get_row(self, row_number):
         # Receives a row number, returns a set with all pieces contained in it.
         # [0, 1, 2, 3] represents the first row of the board. All rows contain four squares.
-        # row_pos needs to contain strings on it because Piece.get_position() returns a number in type string.
-
-        row_pos = [0, 1, 2, 3]
-        row_pos = list(map((lambda pos: str(pos + (4 * row_number))), row_pos))
-        row = []
+        if row_number < 0 or row_number > 7:
+            return set()
 
-        for piece in self.pieces:
-            if piece.get_position() in row_pos:
-                row.append(piece)
-
-        return set(row)
+        return set(piece for piece in self.squares[row_number * 4:row_number * 4 + 4] if piece is not None)
     
     def get_pieces_by_coords(self, *coords):
         # Receives a variable number of (row, column) pairs.
         # Returns a ordered list of same length with a Piece if found, otherwise None.
-        row_memory = dict() # Used to not have to keep calling get_row().
         results = []
 
-        for coord_pair in coords:
-            if coord_pair[0] in row_memory:
-                current_row = row_memory[coord_pair[0]]
-            else:
-                current_row = self.get_row(coord_pair[0])
-                row_memory[coord_pair[0]] = current_row
-            
-            for piece in current_row:
-                if self.get_col_number(int(piece.get_position())) == coord_pair[1]:
-                    results.append(piece)
-                    break
+        for row, column in coords:
+            position = get_position_with_row_col(row, column)
+
+            # Coordinates outside the board or on a light square never have a piece.
+            if 0 <= row <= 7 and 0 <= column <= 7 and self.get_col_number(position) == column:
+                results.append(self.squares[position])
             else:
-                # This runs if 'break' isn't called on the for loop above.
                 results.append(None)
         
         return results
     
     def move_piece(self, moved_index, new_position):
-        def is_eat_movement(current_position):
-            # If the difference in the rows of the current and next positions isn't 1, i.e. if the piece isn't moving one square, 
-            # then the piece is eating another piece.
-            return abs(self.get_row_number(current_position) - self.get_row_number(new_position)) != 1
-
         def get_eaten_index(current_position):
-            current_coords = [self.get_row_number(current_position), self.get_col_number(current_position)]
-            new_coords = [self.get_row_number(new_position), self.get_col_number(new_position)]
-            eaten_coords = [current_coords[0], current_coords[1]]
-
-            # Dividing by 2 because neither the current position or the new one is desired, but the one in the middle.
-            # Getting the difference between the new coordinates and current coordinates helps getting the direction.
-            eaten_coords[0] += (new_coords[0] - current_coords[0]) // 2
-            eaten_coords[1] += (new_coords[1] - current_coords[1]) // 2
-
-            # Converting to string to compare later.
-            eaten_position = str(get_position_with_row_col(eaten_coords[0], eaten_coords[1]))
-
-            for index, piece in enumerate(self.pieces):
-                if piece.get_position() == eaten_position:
-                    return index
+            # Returns the index of the piece jumped over when moving from current_position to new_position, or -1 if it isn't a jump.
+            eaten_position = JUMPED_SQUARES[current_position].get(new_position)
+            return -1 if eaten_position is None else self.get_index_by_position(eaten_position)
 
         def is_king_movement(piece):
             # Receives the piece moving and returns True if the move turns that piece into a king.
@@ -111,29 +137,111 @@ class Board:
             return end_row == king_row
 
         piece_to_move = self.pieces[moved_index]
-
-        # Delete piece from the board if this move eats another piece
-        if is_eat_movement(int(piece_to_move.get_position())):
-            self.pieces.pop(get_eaten_index(int(piece_to_move.get_position()))) 
+        old_position = piece_to_move.get_position()
+        had_eaten = piece_to_move.get_has_eaten()
+        eaten_index = get_eaten_index(old_position)
+        eaten_piece = None
+
+        # Delete piece from the board if this move eats another piece.
+        # The last piece of the list takes its place, so no other piece changes index and undo_move() can swap them back.
+        if eaten_index != -1:
+            eaten_piece = self.pieces[eaten_index]
+            last_piece = self.pieces.pop()
+
+            if last_piece is not eaten_piece:
+                self.pieces[eaten_index] = last_piece
+                self.indices[last_piece.get_position()] = eaten_index
+
+            self.squares[eaten_piece.get_position()] = None
+            self.indices[eaten_piece.get_position()] = -1
             piece_to_move.set_has_eaten(True)
         else:
             piece_to_move.set_has_eaten(False)
 
         # Turn piece into a king if it reaches the other side of the board
-        if is_king_movement(piece_to_move):
+        promoted = is_king_movement(piece_to_move)
+
+        if promoted:
             piece_to_move.set_is_king(True)
 
         # Actually move
+        bitboard_record = self.bitboard.make_move(old_position, new_position)
         piece_to_move.set_position(new_position)
+        self.squares[old_position] = None
+        self.squares[new_position] = piece_to_move
+        self.indices[new_position] = self.indices[old_position]
+        self.indices[old_position] = -1
+        self.version += 1
+
+        if self.listeners:
+            self.notify_listeners({"moved": (old_position, new_position), "captured": eaten_piece, "promoted": promoted, "undone": False})
+
+        # Everything needed by undo_move() to revert this move.
+        return (piece_to_move, old_position, had_eaten, promoted, eaten_index, eaten_piece, bitboard_record)
+
+    def undo_move(self, record):
+        # Receives a record returned by move_piece() and reverts that move, putting back any eaten piece at its old index.
+        piece_moved, old_position, had_eaten, promoted, eaten_index, eaten_piece, bitboard_record = record
+
+        new_position = piece_moved.get_position()
+        self.bitboard.unmake_move(bitboard_record)
+        self.squares[new_position] = None
+        self.squares[old_position] = piece_moved
+        self.indices[old_position] = self.indices[new_position]
+        self.indices[new_position] = -1
+        piece_moved.set_position(old_position)
+        piece_moved.set_has_eaten(had_eaten)
+
+        if promoted:
+            piece_moved.set_is_king(False)
+
+        if eaten_piece is not None:
+            if eaten_index < len(self.pieces):
+                # The piece that took the eaten one's place goes back to the end of the list.
+                last_piece = self.pieces[eaten_index]
+                self.pieces.append(last_piece)
+                self.indices[last_piece.get_position()] = len(self.pieces) - 1
+                self.pieces[eaten_index] = eaten_piece
+            else:
+                self.pieces.append(eaten_piece)
+
+            self.squares[eaten_piece.get_position()] = eaten_piece
+            self.indices[eaten_piece.get_position()] = eaten_index
+
+        self.version += 1
+
+        if self.listeners:
+            self.notify_listeners({"moved": (new_position, old_position), "captured": eaten_piece, "promoted": promoted, "undone": True})
+
+    def make_legal_move(self, move):
+        # Receives a move dict from legal_moves() and makes it, landing on every position of its path in turn.
+        # Returns the records of each hop, to be given to unmake_legal_move().
+        records = []
+        position = move["position_from"]
+
+        for landing in move["path"]:
+            records.append(self.move_piece(self.get_index_by_position(position), landing))
+            position = landing
+
+        return records
+
+    def unmake_legal_move(self, records):
+        # Reverts a move made by make_legal_move(), undoing its hops in reverse.
+        for record in reversed(records):
+            self.undo_move(record)
     
-    def get_winner(self):
-        # Returns the winning color or None if no player has won yet
-        current_color = self.pieces[0].get_color()
+    def count_men(self, color):
+        # Piece counts and the score are kept up to date by the bitboard on every move, so reading them is O(1).
+        return self.bitboard.count_men(color)
 
-        for piece in self.pieces:
-            if piece.get_color() != current_color:
-                break
-        else:
-            return current_color
-        
-        return None
\ No newline at end of file
+    def count_kings(self, color):
+        return self.bitboard.count_kings(color)
+
+    def get_score(self):
+        # Returns the material and positional score of the board (see evaluation.py), positive when it favors white.
+        return self.bitboard.get_score()
+
+    def get_winner(self, turn=None):
+        # Returns the winning color or None if no player has won yet.
+        # If the color to move is given, it also loses when it has no legal moves left.
+        return self.bitboard.get_winner(turn)
\ No newline at end of file
@@ -1,13 +1,20 @@
-from utils import get_piece_gui_coords, get_piece_position
+import os
+from utils import get_piece_gui_coords, get_piece_position, get_surface_mouse_offset
+from held_piece import HeldPiece
 import pygame
 
-# Preload images
-BLACK_PIECE_SURFACE = pygame.image.load("images/black_piece.png")
-WHITE_PIECE_SURFACE = pygame.image.load("images/white_piece.png")
-BLACK_KING_PIECE_SURFACE = pygame.image.load("images/black_king_piece.png")
-WHITE_KING_PIECE_SURFACE = pygame.image.load("images/white_king_piece.png")
-MOVE_MARK = pygame.image.load("images/marking.png")
-BOARD = pygame.image.load("images/board.png")
+# Images are loaded the first time something is drawn, from the images folder next to this file.
+IMAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+images = {}
+
+def get_image(name):
+    # Receives an image's name (e.g.: "board"), returns its surface, loading it if it wasn't loaded yet.
+    # Once the window exists, images are converted to its pixel format so drawing them doesn't convert them every time.
+    if name not in images:
+        image = pygame.image.load(os.path.join(IMAGES_PATH, name + ".png"))
+        images[name] = image.convert_alpha() if pygame.display.get_surface() is not None else image
+
+    return images[name]
 
 # GUI specifications
 BOARD_POSITION = (26, 26)
@@ -16,82 +23,174 @@ SQUARE_DIST = 56
 
 class BoardGUI:
     def __init__(self, board):
-        self.pieces = self.get_piece_properties(board)
-        self.hidden_piece = -1 # This attribute is -1 when no piece must be hidden
+        # Pieces are kept by position and updated with each move made on the board, instead of being built again from it.
+        self.board = board
+        self.squares = self.get_piece_properties(board)
+        self.hidden_piece = -1 # Position of the piece that must be hidden, or -1 when there's none.
+        self.held_piece = None # HeldPiece following the mouse, if any.
         self.move_marks = []
+        self.labels = [] # (surface, position) pairs drawn over the window, like the turn text.
+        self.background = None # Everything but the held piece, drawn by draw(). None when it has to be drawn again.
+        self.held_piece_rect = None # Where draw() last drew the held piece.
+        board.add_listener(self.apply_move)
 
-    def set_pieces(self, piece_list):
-        self.pieces = piece_list
+    def apply_move(self, move):
+        # Receives what changed in a move made or undone on the board (see Board.add_listener()) and updates only those pieces.
+        position_from, position_to = move["moved"]
+        piece = self.squares[position_from]
+        self.squares[position_from] = None
+        self.squares[position_to] = piece
+        piece["rect"] = self.get_piece_rect(position_to)
 
-    def get_piece_properties(self, board):
-        # Receives a board object, returns a list of its pieces organized in 3 dictionary keys.
-        initial_pieces = board.get_pieces()
-        pieces = []
+        if move["promoted"]:
+            piece["is_king"] = not move["undone"]
+
+        captured = move["captured"]
 
-        for piece in initial_pieces:
-            piece_position = int(piece.get_position())
-            piece_row = board.get_row_number(piece_position)
-            piece_column = board.get_col_number(piece_position)
-            piece_properties = dict()
+        if captured is not None:
+            self.squares[captured.get_position()] = self.get_properties(captured) if move["undone"] else None
 
-            piece_properties["rect"] = pygame.Rect(get_piece_gui_coords((piece_row, piece_column), SQUARE_DIST, TOPLEFTBORDER), (41, 41))
-            piece_properties["color"] = piece.get_color()
-            piece_properties["is_king"] = piece.is_king()
+        self.background = None
+
+    def set_labels(self, labels):
+        # Receives a list of (surface, position) pairs to draw over the window. Only redraws them if they changed.
+        if labels != self.labels:
+            self.labels = labels
+            self.background = None
+
+    def get_piece_properties(self, board):
+        # Receives a board object, returns a list with the piece on each of the 32 positions organized in 3 dictionary keys, or None.
+        squares = [None] * 32
 
-            pieces.append(piece_properties)
+        for piece in board.get_pieces():
+            squares[piece.get_position()] = self.get_properties(piece)
         
-        return pieces
+        return squares
+
+    def get_properties(self, piece):
+        # Receives a Piece, returns its rect, color and whether it is a king.
+        return {"rect": self.get_piece_rect(piece.get_position()), "color": piece.get_color(), "is_king": piece.is_king()}
+
+    def get_piece_rect(self, position):
+        coords = (self.board.get_row_number(position), self.board.get_col_number(position))
+        return pygame.Rect(get_piece_gui_coords(coords, SQUARE_DIST, TOPLEFTBORDER), (41, 41))
     
-    def get_piece_by_index(self, index):
-        return self.pieces[index]
+    def get_piece_by_position(self, position):
+        return self.squares[position]
 
-    def hide_piece(self, index):
-        # Index of Board pieces and BoardGUI pieces is kept the same.
-        self.hidden_piece = index
+    def hide_piece(self, position):
+        self.hidden_piece = position
+        self.background = None
     
     def show_piece(self):
-        # Reveals hidden piece and returns the piece index
+        # Reveals hidden piece and returns its position
         piece_shown = self.hidden_piece
         self.hidden_piece = -1
+        self.background = None
         return piece_shown
 
     def draw_pieces(self, display_surface):
-        for index, piece in enumerate(self.pieces):
-            if index == self.hidden_piece:
+        for position, piece in enumerate(self.squares):
+            if piece is None or position == self.hidden_piece:
                 continue
             
-            if piece["is_king"]:
-                display_surface.blit(BLACK_KING_PIECE_SURFACE if piece["color"] == "B" else WHITE_KING_PIECE_SURFACE, piece["rect"])
-            else:
-                display_surface.blit(BLACK_PIECE_SURFACE if piece["color"] == "B" else WHITE_PIECE_SURFACE, piece["rect"])
+            display_surface.blit(self.get_piece_surface(piece["color"], piece["is_king"]), piece["rect"])
     
     def draw_board(self, display_surface):
-        display_surface.blit(BOARD, BOARD_POSITION)
+        display_surface.blit(get_image("board"), BOARD_POSITION)
         
         # Also draws move marks if needed.
         if len(self.move_marks) != 0:
             for rect in self.move_marks:
-                display_surface.blit(MOVE_MARK, rect)
+                display_surface.blit(get_image("marking"), rect)
+
+    def draw_held_piece(self, display_surface):
+        if self.held_piece is not None:
+            self.held_piece.draw_piece(display_surface)
+
+    def draw(self, display_surface):
+        # Draws what changed since the last call and returns the list of rects that changed, to be passed to pygame.display.update().
+        # The board, move marks, pieces and labels are drawn once to a background surface, which is only drawn again after they change.
+        # While a piece is held, only the spots it leaves and moves to are drawn, by copying them from the background.
+        if self.background is None:
+            self.background = pygame.Surface(display_surface.get_size()).convert()
+            self.draw_board(self.background)
+            self.draw_pieces(self.background)
+
+            for surface, position in self.labels:
+                self.background.blit(surface, position)
+
+            display_surface.blit(self.background, (0, 0))
+            self.held_piece_rect = None
+            self.draw_held_piece(display_surface)
+
+            if self.held_piece is not None:
+                self.held_piece_rect = self.held_piece.get_rect().copy()
+
+            return [display_surface.get_rect()]
+
+        dirty_rects = []
+
+        if self.held_piece_rect is not None:
+            if self.held_piece is not None and self.held_piece.get_rect_on_mouse() == self.held_piece_rect:
+                return dirty_rects
+
+            display_surface.blit(self.background, self.held_piece_rect, self.held_piece_rect)
+            dirty_rects.append(self.held_piece_rect)
+            self.held_piece_rect = None
+
+        if self.held_piece is not None:
+            self.draw_held_piece(display_surface)
+            self.held_piece_rect = self.held_piece.get_rect().copy()
+            dirty_rects.append(self.held_piece_rect)
+
+        return dirty_rects
     
     def get_piece_on_mouse(self, mouse_pos):
-        for index, piece in enumerate(self.pieces):
-            if piece["rect"].collidepoint(mouse_pos):
-                return {"index": index, "piece": piece}
+        # Returns the position and properties of the piece under the mouse, or None. Only the piece on the square under the mouse is checked.
+        position = get_piece_position(mouse_pos, SQUARE_DIST, TOPLEFTBORDER)
+
+        if not 0 <= position < 32:
+            return None
+
+        piece = self.squares[position]
+
+        # Light squares and the space around a piece map to a square without it, so the piece's own rect decides.
+        if piece is not None and piece["rect"].collidepoint(mouse_pos):
+            return {"position": position, "piece": piece}
         
         return None
 
     def get_surface(self, piece):
         # Returns a proper surface for the given piece.
-        surfaces = [BLACK_PIECE_SURFACE, WHITE_PIECE_SURFACE, BLACK_KING_PIECE_SURFACE, WHITE_KING_PIECE_SURFACE]
-        surfaces = surfaces[2:] if piece.is_king() else surfaces[:2]
+        return self.get_piece_surface(piece.get_color(), piece.is_king())
+
+    def get_piece_surface(self, color, is_king):
+        return get_image(("black" if color == "B" else "white") + ("_king" if is_king else "") + "_piece")
 
-        return surfaces[0] if piece.get_color() == 'B' else surfaces[1]
+    def get_held_piece(self):
+        return self.held_piece
+
+    def hold_piece(self, position, piece, mouse_pos):
+        # Hides the piece on the given position from the board and creates a HeldPiece object to follow the mouse instead.
+        surface = self.get_surface(piece)
+        offset = get_surface_mouse_offset(self.get_piece_by_position(position)["rect"], mouse_pos)
+        self.held_piece = HeldPiece(surface, offset)
+        self.hide_piece(position)
+
+    def release_piece(self):
+        # Puts the held piece back on the board. Returns its position and the move mark it was dropped on, or None if it wasn't dropped on one.
+        position_released = self.held_piece.check_collision(self.move_marks)
+        self.held_piece = None
+        return (self.show_piece(), position_released)
 
     def get_move_marks(self):
         return self.move_marks
 
     def set_move_marks(self, position_list):
         # Sets a list of move marks based on a list of (row, column) tuples.
+        self.background = None
+
         if len(position_list) == 0:
             self.move_marks = []
 
@@ -1,14 +1,21 @@
-import pygame as pg
-from sys import exit, argv
-from pygame.locals import *
-from board_gui import BoardGUI
-from game_control import GameControl
+from sys import exit
+from argparse import ArgumentParser
 
-def main(gamemode):
+def main(gamemode, ai_depth=None):
     # Main setup
+    # If ai_depth isn't given, the AI searches as deep as it can in the AI_DELAY milliseconds between its moves.
+    # pygame is only imported here, so the headless self-play mode never loads it.
+    import pygame as pg
+    from pygame.locals import QUIT, KEYDOWN, K_r, MOUSEBUTTONDOWN, MOUSEBUTTONUP, USEREVENT
+    from game_control import GameControl
+    from board_gui import BoardGUI
+
     pg.init()
     FPS = 30
     PLAYER_COLOR = "W"
+    AI_DELAY = 400
+    IDLE_TIMEOUT = 1000 # Longest time in milliseconds the loop sleeps waiting for events.
+    AI_MOVE_EVENT = USEREVENT + 1 # Posted by the background AI search when it finds its move.
 
     DISPLAYSURF = pg.display.set_mode((700, 500))
     pg.display.set_caption('Checkers in Python')
@@ -17,32 +24,64 @@ def main(gamemode):
 
     # Creates a GameControl with an AI instance if gamemode is "cpu"
     if gamemode == "cpu":
-        game_control = GameControl(PLAYER_COLOR, True)
+        if ai_depth is None:
+            game_control = GameControl(PLAYER_COLOR, True, ai_time_ms=AI_DELAY, renderer_factory=BoardGUI, ai_ponder=True)
+        else:
+            game_control = GameControl(PLAYER_COLOR, True, ai_depth, renderer_factory=BoardGUI, ai_ponder=True)
     else:
-        game_control = GameControl(PLAYER_COLOR, False)
+        game_control = GameControl(PLAYER_COLOR, False, renderer_factory=BoardGUI)
 
     # Font setup
     main_font = pg.font.SysFont("Arial", 25)
     turn_rect = (509, 26)
     winner_rect = (509, 152)
 
+    def post_ai_move(move, search_id):
+        # Called from the AI's thread, hands the move over to the event loop.
+        pg.event.post(pg.event.Event(AI_MOVE_EVENT, move=move, search_id=search_id))
+
+    text_surfaces = {} # Every text is rendered once and reused.
+
+    def render_text(text):
+        if text not in text_surfaces:
+            text_surfaces[text] = main_font.render(text, True, (255, 255, 255))
+
+        return text_surfaces[text]
+
     while True:
         # GUI
-        DISPLAYSURF.fill((0, 0, 0))
-        game_control.draw_screen(DISPLAYSURF)
-
+        # Only the parts of the window that changed are drawn and updated.
         turn_display_text = "White's turn" if game_control.get_turn() == "W" else "Black's turn"
-        DISPLAYSURF.blit(main_font.render(turn_display_text, True, (255, 255, 255)), turn_rect)
+        labels = [(render_text(turn_display_text), turn_rect)]
 
         if game_control.get_winner() is not None:
             winner_display_text = "White wins!" if game_control.get_winner() == "W" else "Black wins!"
-            DISPLAYSURF.blit(main_font.render(winner_display_text, True, (255, 255, 255)), winner_rect)
+            labels.append((render_text(winner_display_text), winner_rect))
+
+        dirty_rects = game_control.draw_screen(DISPLAYSURF, labels)
+
+        if len(dirty_rects) != 0:
+            pg.display.update(dirty_rects)
 
         # Event handling
-        for event in pg.event.get():
+        # While a piece is held the window is drawn FPS times per second so it follows the mouse.
+        # Otherwise the loop sleeps until an event arrives (input, the AI's timer or its move), so an idle game uses no CPU.
+        if game_control.is_holding_piece():
+            fps_clock.tick(FPS)
+            events = pg.event.get()
+        else:
+            events = [pg.event.wait(IDLE_TIMEOUT)] + pg.event.get()
+
+        for event in events:
             if event.type == QUIT:
+                game_control.close()
                 pg.quit()
                 return
+
+            if event.type == KEYDOWN and event.key == K_r:
+                # Restarts the game, cancelling the AI's search if it's thinking.
+                game_control.reset()
+                pg.time.set_timer(USEREVENT, 0)
             
             if event.type == MOUSEBUTTONDOWN:
                 game_control.hold_piece(event.pos)
@@ -51,28 +90,49 @@ def main(gamemode):
                 game_control.release_piece()
 
                 if game_control.get_turn() != PLAYER_COLOR and gamemode == "cpu":
-                    pg.time.set_timer(USEREVENT, 400)
+                    pg.time.set_timer(USEREVENT, AI_DELAY)
             
             if event.type == USEREVENT:
-                # AI movement
+                # AI movement, searched in the background so the window keeps responding.
                 if game_control.get_winner() is not None:
                     continue
 
-                game_control.move_ai()
+                game_control.start_ai_move(post_ai_move)
+
+            if event.type == AI_MOVE_EVENT:
+                game_control.apply_ai_move(event.move, event.search_id)
 
                 if game_control.get_turn() == PLAYER_COLOR:
                     pg.time.set_timer(USEREVENT, 0)
-        
-        pg.display.update()
-        fps_clock.tick(FPS)
+
+def selfplay(games, workers, config_a, config_b, output_path, max_plies, record_path):
+    # Runs AI against AI without a window and prints a summary once every game is done.
+    from selfplay import run_selfplay, MAX_PLIES
+
+    summary = run_selfplay(games, workers, config_a, config_b, output_path, MAX_PLIES if max_plies is None else max_plies, record_path=record_path)
+    print("Played {} games ({:.2f} games/s). A wins: {:.1%}, B wins: {:.1%}, draws: {:.1%}. Results saved to {}".format(
+        summary["games"], summary["games_per_second"], summary["a_win_rate"], summary["b_win_rate"], summary["draw_rate"], output_path))
 
 if __name__ == '__main__':
-    if len(argv) != 2:
-        print("Please specify the game mode. Example: python checkers.py cpu")
+    parser = ArgumentParser(description="Checkers in Python")
+    parser.add_argument("gamemode", choices=["cpu", "pvp", "selfplay"])
+    parser.add_argument("depth", type=int, nargs="?", help="how many moves ahead the computer looks (default: as far as it can in 400 ms)")
+    parser.add_argument("--games", type=int, default=100, help="self-play: number of games")
+    parser.add_argument("--workers", type=int, default=1, help="self-play: number of processes playing games")
+    parser.add_argument("--depth-a", type=int, default=3, help="self-play: search depth of AI A")
+    parser.add_argument("--depth-b", type=int, default=3, help="self-play: search depth of AI B")
+    parser.add_argument("--time-a", type=int, help="self-play: milliseconds AI A searches each move (overrides --depth-a)")
+    parser.add_argument("--time-b", type=int, help="self-play: milliseconds AI B searches each move (overrides --depth-b)")
+    parser.add_argument("--max-plies", type=int, help="self-play: moves after which a game is a draw (default: 200)")
+    parser.add_argument("--output", default="selfplay.jsonl", help="self-play: file the result of each game is written to")
+    parser.add_argument("--record", help="self-play: file the moves of every game are written to as a game record")
+    args = parser.parse_args()
+
+    if args.depth is not None and args.depth < 1:
+        print("The AI depth must be a positive number. Example: python checkers.py cpu 8")
+    elif args.gamemode == "selfplay":
+        selfplay(args.games, args.workers, (args.depth_a, args.time_a), (args.depth_b, args.time_b), args.output, args.max_plies, args.record)
     else:
-        if argv[1] in ["cpu", "pvp"]:
-            main(argv[1])
-        else:
-            print("Game mode not found.")
+        main(args.gamemode, args.depth)
     
     exit()
\ No newline at end of file
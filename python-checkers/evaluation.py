@@ -0,0 +1,42 @@
+# Values used to score positions. BitBoard keeps the sum of the values of its pieces up to date on every move,
+# so scoring a position never has to look at its pieces.
+
+# Value of each kind of piece.
+MAN_VALUE = 100
+KING_VALUE = 160
+
+# Positional value of a man on each row, for a side moving up the board (its men start on rows 5-7 and are crowned on row 0).
+# Men are worth more as they advance, and the ones left on the back row keep the other side from crowning.
+MAN_ROW_VALUES = (0, 12, 9, 6, 4, 2, 0, 5)
+
+# Positional value of a king by how many squares it is from the edge of the board. Kings in the center reach more squares.
+KING_CENTER_VALUES = (0, 4, 8, 10)
+
+def get_man_value(position, moves_up):
+    # Receives a man's position and whether its color moves up the board, returns its value.
+    row = position // 4
+    return MAN_VALUE + MAN_ROW_VALUES[row if moves_up else 7 - row]
+
+def get_king_value(position):
+    row = position // 4
+    column = (position % 4) * 2 + row % 2
+    return KING_VALUE + KING_CENTER_VALUES[min(row, 7 - row, column, 7 - column)]
+
+def build_piece_square_values(color_up):
+    # Returns the value of every kind of piece on every position, as [kind][position] like zobrist.PIECE_KEYS,
+    # when color_up is the color moving up. White pieces count for white (positive values) and black ones against it.
+    values = []
+
+    for is_white in (True, False):
+        sign = 1 if is_white else -1
+        moves_up = is_white == (color_up == "W")
+        values.append([sign * get_man_value(position, moves_up) for position in range(32)])
+        values.append([sign * get_king_value(position) for position in range(32)])
+
+    return values
+
+# PIECE_SQUARE_VALUES[color_up][kind][position]
+PIECE_SQUARE_VALUES = {color_up: build_piece_square_values(color_up) for color_up in ("W", "B")}
+
+# Value of each empty square a king can step to (BitBoard.get_king_mobility()). Kings that are boxed in are worth less.
+KING_MOBILITY_VALUE = 4
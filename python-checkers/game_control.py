@@ -1,21 +1,32 @@
-from piece import Piece
-from board import Board
-from board_gui import BoardGUI
-from held_piece import HeldPiece
+from board import Board, get_start_pieces
 from ai import AI
-from utils import get_surface_mouse_offset, get_piece_position
+from ai_worker import AIWorker
 
 class GameControl:
-    def __init__(self, player_color, is_computer_opponent):
+    def __init__(self, player_color, is_computer_opponent, ai_depth=3, ai_time_ms=None, ai_workers=1, renderer_factory=None, ai_ponder=False):
+        # If ai_time_ms is given, the AI searches as deep as it can within that time instead of stopping at ai_depth.
+        # ai_workers is the number of processes the AI searches with.
+        # If ai_ponder is True, the AI searches the player's possible moves while the player thinks, so it can answer the actual one sooner.
+        # renderer_factory receives a Board and returns the object that draws it and handles the mouse, like BoardGUI.
+        # Without it the game runs headless: nothing is drawn and pieces can't be held, but the AI still plays.
+        self.player_color = player_color
         self.turn = player_color
         self.winner = None
         self.board = None
         self.board_draw = None
-        self.held_piece = None
+        self.renderer_factory = renderer_factory
         self.ai_control = None
+        self.ai_worker = None
+        self.ai_time_ms = ai_time_ms
+        self.ai_ponder = ai_ponder
+        self.jumping_position = None # Position of the piece in the middle of a multi-jump, which has to keep jumping.
+        self.legal_moves = None # Legal moves of the side to move, computed once per position (see get_legal_moves()).
+        self.legal_moves_key = None # (board, board version, turn) the cached legal moves were computed for.
+        self.ai_search = None # (search id, board version, turn) of the background search whose move hasn't been applied yet, or None.
 
         if is_computer_opponent:
-            self.ai_control = AI("B") if player_color == "W" else AI("W")
+            self.ai_control = AI("B" if player_color == "W" else "W", ai_depth, workers=ai_workers)
+            self.ai_worker = AIWorker(self.ai_control)
 
         self.setup()
 
@@ -25,118 +36,168 @@ class GameControl:
     def get_winner(self):
         return self.winner
 
+    def is_holding_piece(self):
+        # Returns True if the player is dragging a piece.
+        return self.board_draw is not None and self.board_draw.get_held_piece() is not None
+
+    def get_legal_moves(self):
+        # Returns the legal moves of the side to move, like Board.legal_moves().
+        # They're only computed again after the board changes or the turn passes, so clicks and drops just read them.
+        key = (self.board, self.board.get_version(), self.turn)
+
+        if key != self.legal_moves_key:
+            self.legal_moves = self.board.legal_moves(self.turn)
+            self.legal_moves_key = key
+
+        return self.legal_moves
+
     def setup(self):
         # Initial setup
-        pieces = []
-
-        for opponent_piece in range(0, 12):
-            pieces.append(Piece(str(opponent_piece) + 'BN'))
-        
-        for player_piece in range(20, 32):
-            pieces.append(Piece(str(player_piece) + 'WN'))
-        
-        self.board = Board(pieces, self.turn)
-        self.board_draw = BoardGUI(self.board)        
-        pass
+        self.board = Board(get_start_pieces(), self.turn)
+        self.board_draw = None if self.renderer_factory is None else self.renderer_factory(self.board)
+        self.start_pondering()
+
+    def reset(self):
+        # Cancels any AI search in progress and starts a new game.
+        self.cancel_ai()
+        self.turn = self.player_color
+        self.winner = None
+        self.jumping_position = None
+        self.setup()
     
-    def draw_screen(self, display_surface):
-        self.board_draw.draw_board(display_surface)
-        self.board_draw.draw_pieces(display_surface)
+    def draw_screen(self, display_surface, labels=[]):
+        # Draws the game and the given (surface, position) labels, returns the list of rects of display_surface that changed.
+        if self.board_draw is None:
+            return []
 
-        if self.held_piece is not None:
-            self.held_piece.draw_piece(display_surface)
+        self.board_draw.set_labels(labels)
+        return self.board_draw.draw(display_surface)
 
     def hold_piece(self, mouse_pos):
+        if self.board_draw is None:
+            return
+
         piece_clicked = self.board_draw.get_piece_on_mouse(mouse_pos)
-        board_pieces = self.board.get_pieces()
-        has_jump_restraint = False # True if any piece can jump in one of its moves, forcing the player to jump
 
         if piece_clicked is None:
             return
         
         if piece_clicked["piece"]["color"] != self.turn:
             return
-        
-        # Determines if player has a jump restraint
-        for piece in board_pieces:
-            for move in piece.get_moves(self.board):
-                if move["eats_piece"]:
-                    if piece.get_color() == piece_clicked["piece"]["color"]:
-                        has_jump_restraint = True
-            else:
-                continue
-            break
-        
-        piece_moves = board_pieces[piece_clicked["index"]].get_moves(self.board)
 
-        if has_jump_restraint:
-            piece_moves = list(filter(lambda move: move["eats_piece"] == True, piece_moves))
+        # Against the computer, the player can't touch the pieces while the AI is thinking.
+        if self.ai_control is not None and self.turn != self.player_color:
+            return
+
+        position_clicked = piece_clicked["position"]
+
+        # Only the piece in the middle of a multi-jump can be moved until it's finished.
+        if self.jumping_position is not None and position_clicked != self.jumping_position:
+            return
 
         move_marks = []
 
-        # Gets possible moving positions and tells BoardGUI to draw them
-        for possible_move in piece_moves:
-            row = self.board.get_row_number(int(possible_move["position"]))
-            column = self.board.get_col_number(int(possible_move["position"]))
-            move_marks.append((row, column))
+        # Gets the first position of every legal move of this piece and tells BoardGUI to draw them.
+        # Legal moves already force a jump if any piece of this color can make one.
+        for possible_move in self.get_legal_moves():
+            if possible_move["position_from"] == position_clicked:
+                row = self.board.get_row_number(possible_move["path"][0])
+                column = self.board.get_col_number(possible_move["path"][0])
 
-        self.board_draw.set_move_marks(move_marks)
+                if (row, column) not in move_marks:
+                    move_marks.append((row, column))
 
-        self.board_draw.hide_piece(piece_clicked["index"])
-        self.set_held_piece(piece_clicked["index"], board_pieces[piece_clicked["index"]], mouse_pos)
+        self.board_draw.set_move_marks(move_marks)
+        self.board_draw.hold_piece(position_clicked, self.board.get_piece_by_position(position_clicked), mouse_pos)
     
     def release_piece(self):
-        if self.held_piece is None:
+        if self.board_draw is None or self.board_draw.get_held_piece() is None:
             return
 
-        position_released = self.held_piece.check_collision(self.board_draw.get_move_marks())
-        moved_index = self.board_draw.show_piece()
-        piece_moved = self.board.get_piece_by_index(moved_index)
+        moved_position, position_released = self.board_draw.release_piece()
+        piece_moved = self.board.get_piece_by_position(moved_position)
 
-        # Only moves the piece if dropped in a proper move mark        
+        # Only moves the piece if dropped in a proper move mark. BoardGUI listens to the board, so it updates the pieces itself.
         if position_released is not None:
-            self.board.move_piece(moved_index, self.board_draw.get_position_by_rect(position_released))
-            self.board_draw.set_pieces(self.board_draw.get_piece_properties(self.board))
-            self.winner = self.board.get_winner()
-
-            # Check if player can eat another piece, granting an extra turn.
-            jump_moves = list(filter(lambda move: move["eats_piece"] == True, piece_moved.get_moves(self.board)))
-            
-            if len(jump_moves) == 0 or piece_moved.get_has_eaten() == False:
+            self.board.move_piece(self.board.get_index_by_position(moved_position), self.board_draw.get_position_by_rect(position_released))
+
+            # A piece that has eaten keeps jumping while it can, in the same turn.
+            if piece_moved.get_has_eaten() and self.can_keep_jumping(piece_moved.get_position()):
+                self.jumping_position = piece_moved.get_position()
+            else:
+                self.jumping_position = None
                 self.turn = "B" if self.turn == "W" else "W"
 
-        self.held_piece = None
+            self.winner = self.board.get_winner(self.turn)
+
         self.board_draw.set_move_marks([])
 
-    def set_held_piece(self, index, piece, mouse_pos):
-        # Creates a HeldPiece object to follow the mouse
-        surface = self.board_draw.get_surface(piece)
-        offset = get_surface_mouse_offset(self.board_draw.get_piece_by_index(index)["rect"], mouse_pos)
-        self.held_piece = HeldPiece(surface, offset)
+    def can_keep_jumping(self, position):
+        # Returns True if the piece on the given position, which just jumped, can jump again.
+        return any(move["eats_piece"] and move["position_from"] == position for move in self.get_legal_moves())
+
+    def start_pondering(self):
+        # Lets the AI search the player's possible moves in the background while it's the player's turn.
+        if self.ai_ponder and self.ai_worker is not None and self.turn == self.player_color and self.winner is None:
+            self.ai_worker.ponder(self.board, self.ai_time_ms)
+
+    def stop_pondering(self):
+        # Stops pondering before the AI searches its move. What it found stays in the AI for that search to use.
+        if self.ai_worker is not None and self.ai_worker.is_pondering():
+            self.ai_worker.cancel()
 
     def move_ai(self):
         # Gets best move from an AI instance and moves it.
-        if self.turn == "W":
+        if self.turn == self.player_color:
+            return
+
+        self.stop_pondering()
+        self.apply_ai_move(self.ai_control.get_move(self.board, self.ai_time_ms))
+
+    def start_ai_move(self, on_result):
+        # Starts searching the AI's move in the background, unless it isn't the AI's turn or a search is already running
+        # or has found a move that apply_ai_move() hasn't received yet.
+        # on_result(move, search_id) is called from another thread once the move is found; it should hand both to apply_ai_move().
+        if self.turn == self.player_color or self.winner is not None or self.ai_search is not None:
             return
 
-        optimal_move = self.ai_control.get_move(self.board)
-        index_moved = -1
-        piece_moved = None
+        self.stop_pondering()
 
-        for index, piece in enumerate(self.board.get_pieces()):
-            if piece.get_position() == optimal_move["position_from"]:
-                index_moved = index
-                piece_moved = piece
-                break
-        else:
+        if self.ai_worker.start(self.board, self.ai_time_ms, on_result):
+            self.ai_search = (self.ai_worker.get_search_id(), self.board.get_version(), self.turn)
+
+    def cancel_ai(self):
+        # Stops the background AI search, if any. Moves it already found are ignored by apply_ai_move().
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
+
+        self.ai_search = None
+
+    def close(self):
+        # Stops the AI and the processes it uses. Called when the game is closed.
+        self.cancel_ai()
+
+        if self.ai_control is not None:
+            self.ai_control.close()
+
+    def apply_ai_move(self, optimal_move, search_id=None):
+        # Moves the piece chosen by the AI, jumping through its whole path. Moves from a search that was cancelled or superseded are ignored,
+        # and so are moves searched on a board or turn that changed since, which would no longer be legal.
+        if search_id is not None:
+            if self.ai_search is None or search_id != self.ai_search[0]:
+                return
+
+            searched = self.ai_search
+            self.ai_search = None
+
+            if searched[1:] != (self.board.get_version(), self.turn) or optimal_move is None:
+                return
+
+        if not self.board.has_piece(optimal_move["position_from"]):
             raise RuntimeError("AI was supposed to return a move from an existing piece but found none.")
         
-        self.board.move_piece(index_moved, int(optimal_move["position_to"]))
-        self.board_draw.set_pieces(self.board_draw.get_piece_properties(self.board))
-        self.winner = self.board.get_winner()
-
-        # Check if AI can eat another piece, granting an extra turn.
-        jump_moves = list(filter(lambda move: move["eats_piece"] == True, piece_moved.get_moves(self.board)))
+        self.board.make_legal_move(optimal_move)
 
-        if len(jump_moves) == 0 or piece_moved.get_has_eaten() == False:
-            self.turn = "B" if self.turn == "W" else "W"
\ No newline at end of file
+        self.turn = "B" if self.turn == "W" else "W"
+        self.winner = self.board.get_winner(self.turn)
+        self.start_pondering()
\ No newline at end of file
@@ -0,0 +1,299 @@
+import re
+from struct import Struct
+from argparse import ArgumentParser
+from bitboard import BitBoard, DIRECTIONS
+
+# Game records: whole games stored compactly, to be written and read in bulk (self-play logs, datasets).
+# A file has a header followed by games one after the other. Each game has the bitboards of the position it starts from
+# and its moves packed into a few bytes each, so games are read one at a time without loading the whole file.
+# A game is a dict with the keys "white", "black" and "kings" (bitboards of the start position), "color_up",
+# "turn" (color that moves first), "winner" ("W", "B" or None for a draw) and "moves", a list of moves with the keys of Board.legal_moves().
+#
+# Each move is packed as one byte with where it starts (bits 0-4), the direction of its first step or jump (bits 5-6, an index of
+# bitboard.DIRECTIONS) and whether it's a jump (bit 7). A jump is followed by a byte with how many more jumps it makes
+# and their directions, 2 bits each, four to a byte. Steps take one byte and single jumps two.
+
+MAGIC = b"CKGR"
+VERSION = 1
+HEADER = Struct("<4sH") # Magic and version.
+GAME = Struct("<3I3BHI") # White, black and kings bitboards, color up, color to move, winner, number of moves and bytes of moves.
+
+COLORS = ("W", "B")
+WINNERS = (None, "W", "B")
+JUMP_FLAG = 0x80
+
+def build_hop_tables():
+    # Returns, for each position, the position a step and a jump in each direction of DIRECTIONS land on (None if off the board).
+    steps = []
+    jumps = []
+
+    for position in range(32):
+        step_landings = []
+        jump_landings = []
+
+        for direction, _, _ in DIRECTIONS:
+            neighbor_bit = direction(1 << position)
+            landing_bit = direction(neighbor_bit)
+            step_landings.append(neighbor_bit.bit_length() - 1 if neighbor_bit else None)
+            jump_landings.append(landing_bit.bit_length() - 1 if landing_bit else None)
+
+        steps.append(step_landings)
+        jumps.append(jump_landings)
+
+    return steps, jumps
+
+STEP_LANDINGS, JUMP_LANDINGS = build_hop_tables()
+
+def get_start_game():
+    # Returns a game with no moves yet, starting from the position GameControl starts from.
+    return {"white": 0xFFF00000, "black": 0x00000FFF, "kings": 0, "color_up": "W", "turn": "W", "winner": None, "moves": []}
+
+def encode_moves(moves):
+    # Receives a list of moves (dicts with "position_from" and "path"), returns them packed as bytes.
+    data = bytearray()
+
+    for move in moves:
+        position = move["position_from"]
+        is_jump = move["eats_piece"]
+        landings = JUMP_LANDINGS if is_jump else STEP_LANDINGS
+        directions = []
+
+        for landing in move["path"]:
+            directions.append(landings[position].index(landing))
+            position = landing
+
+        data.append(move["position_from"] | directions[0] << 5 | (JUMP_FLAG if is_jump else 0))
+
+        if is_jump:
+            data.append(len(directions) - 1)
+
+            for index in range(1, len(directions), 4):
+                packed = 0
+
+                for shift, direction in enumerate(directions[index:index + 4]):
+                    packed |= direction << (shift * 2)
+
+                data.append(packed)
+
+    return bytes(data)
+
+def decode_moves(data, count):
+    # Receives bytes packed by encode_moves() and how many moves they have, returns the moves with the keys of Board.legal_moves().
+    moves = []
+    offset = 0
+
+    for _ in range(count):
+        first = data[offset]
+        position_from = first & 0x1F
+        is_jump = first & JUMP_FLAG != 0
+        landings = JUMP_LANDINGS if is_jump else STEP_LANDINGS
+        directions = [first >> 5 & 0x3]
+        offset += 1
+
+        if is_jump:
+            more = data[offset]
+            offset += 1
+
+            for index in range(more):
+                directions.append(data[offset + index // 4] >> (index % 4 * 2) & 0x3)
+
+            offset += (more + 3) // 4
+
+        path = []
+        position = position_from
+
+        for direction in directions:
+            position = landings[position][direction]
+            path.append(position)
+
+        moves.append({"position_to": path[-1], "position_from": position_from, "eats_piece": is_jump, "path": tuple(path)})
+
+    return moves
+
+class GameWriter:
+    def __init__(self, path):
+        # Creates the file (or empties it) and writes each game as soon as write_game() receives it.
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def write_game(self, game):
+        data = encode_moves(game["moves"])
+        self.file.write(GAME.pack(game["white"], game["black"], game["kings"], COLORS.index(game["color_up"]), COLORS.index(game["turn"]),
+                                  WINNERS.index(game["winner"]), len(game["moves"]), len(data)))
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+def read_games(path):
+    # Yields the games of a file written by GameWriter, one at a time.
+    with open(path, "rb") as file:
+        magic, version = HEADER.unpack(file.read(HEADER.size))
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} isn't a game record file of version {}.".format(path, VERSION))
+
+        while True:
+            header = file.read(GAME.size)
+
+            if len(header) == 0:
+                return
+
+            white, black, kings, color_up, turn, winner, count, size = GAME.unpack(header)
+            yield {"white": white, "black": black, "kings": kings, "color_up": COLORS[color_up], "turn": COLORS[turn],
+                   "winner": WINNERS[winner], "moves": decode_moves(file.read(size), count)}
+
+# PDN numbers the squares 1-32 from black's side of the board, with black at the top and white moving up.
+# Each row is numbered from the left as seen by white, where positions go the other way, so a row's order is reversed.
+# Results are written as white's score first.
+PDN_RESULTS = {"W": "1-0", "B": "0-1", None: "1/2-1/2"}
+
+# Winner of every finished result read, including the ones scored 2 points per game. An unfinished game ("*") has none.
+PDN_WINNERS = {"1-0": "W", "2-0": "W", "0-1": "B", "0-2": "B", "1/2-1/2": None, "1-1": None}
+
+def get_pdn_square(position, color_up):
+    # Receives a position (0-31), returns its PDN square. If black moves up, the board is turned around first.
+    if color_up != "W":
+        position = 31 - position
+
+    return position // 4 * 4 + 3 - position % 4 + 1
+
+def get_position(pdn_square, color_up):
+    # Receives a PDN square, returns its position (0-31). get_pdn_square() reversed.
+    index = pdn_square - 1
+    position = index // 4 * 4 + 3 - index % 4
+    return position if color_up == "W" else 31 - position
+
+def get_fen(game):
+    # Returns the FEN tag of the position a game starts from, like "W:W21,22,K23:B1,2".
+    sides = []
+
+    for color, bitboard in (("W", game["white"]), ("B", game["black"])):
+        squares = sorted((get_pdn_square(position, game["color_up"]), game["kings"] >> position & 1) for position in range(32) if bitboard >> position & 1)
+        sides.append(color + ",".join(("K" if is_king else "") + str(square) for square, is_king in squares))
+
+    return "{}:{}:{}".format(game["turn"], *sides)
+
+def to_pdn(game):
+    # Returns the game as PDN text, with the start position as a FEN tag and every jump written with all its squares.
+    color_up = game["color_up"]
+    result = PDN_RESULTS[game["winner"]]
+    lines = ['[GameType "21"]', '[FEN "{}"]'.format(get_fen(game)), '[Result "{}"]'.format(result), ""]
+    tokens = []
+    turn = game["turn"]
+    number = 1
+
+    for index, move in enumerate(game["moves"]):
+        # Moves are numbered in black and white pairs, black first. A white move without its black one gets "...".
+        if turn == "B":
+            tokens.append("{}.".format(number))
+        elif index == 0:
+            tokens.append("{}...".format(number))
+
+        squares = [get_pdn_square(position, color_up) for position in (move["position_from"],) + tuple(move["path"])]
+        tokens.append(("x" if move["eats_piece"] else "-").join(str(square) for square in squares))
+
+        if turn == "W":
+            number += 1
+
+        turn = "B" if turn == "W" else "W"
+
+    tokens.append(result)
+    lines.append(" ".join(tokens))
+    return "\n".join(lines) + "\n"
+
+def from_pdn(text, color_up="W"):
+    # Receives the PDN text of one game, returns it as a game dict with white moving up if color_up is "W".
+    # Moves are checked against the legal moves of each position, which also finds the path of jumps written only with where they start and end.
+    # Raises ValueError if the game isn't finished, since game records only hold finished games.
+    tags = dict(re.findall(r'\[(\w+)\s+"([^"]*)"\]', text))
+    game = get_start_game()
+    game["color_up"] = color_up
+
+    if "FEN" in tags:
+        turn, *sides = tags["FEN"].split(":")
+        game["turn"] = turn.strip().upper()
+        game["white"] = game["black"] = game["kings"] = 0
+
+        for side in sides:
+            side = side.strip()
+            color = "white" if side[0].upper() == "W" else "black"
+
+            for square in filter(None, side[1:].split(",")):
+                square = square.strip()
+                bit = 1 << get_position(int(square.lstrip("Kk")), color_up)
+                game[color] |= bit
+
+                if square[0] in "Kk":
+                    game["kings"] |= bit
+    else:
+        # PDN games without a FEN tag start from the usual position, with black moving first.
+        game["turn"] = "B"
+
+        if color_up != "W":
+            game["white"], game["black"] = game["black"], game["white"]
+
+    # The result is taken from its tag or else from the end of the moves.
+    results = re.findall(r"(?<!\S)(1-0|0-1|1/2-1/2|2-0|0-2|1-1|\*)(?!\S)", re.sub(r"\[[^\]]*\]|\{[^}]*\}", " ", text))
+    result = tags.get("Result", results[-1] if len(results) != 0 else None)
+
+    if result not in PDN_WINNERS:
+        raise ValueError("Only finished games can be recorded, but the game's result is {}.".format("missing" if result is None else result))
+
+    game["winner"] = PDN_WINNERS[result]
+    board = BitBoard(game["white"], game["black"], game["kings"], color_up)
+    turn = game["turn"]
+    # Tags, comments, variations and the result are left out of the moves.
+    move_text = re.sub(r"\[[^\]]*\]|\{[^}]*\}|\([^)]*\)|(?<!\S)(1-0|0-1|1/2-1/2|2-0|0-2|1-1)(?!\S)", " ", text)
+
+    for token in re.findall(r"\d+(?:[-x]\d+)+", move_text):
+        positions = [get_position(int(square), color_up) for square in re.split(r"[-x]", token)]
+        matches = [move for move in board.get_legal_moves(turn) if move[0] == positions[0] and move[3][-1] == positions[-1]]
+
+        if len(matches) > 1:
+            # Jumps written with every square they land on tell apart the ones that end on the same square.
+            matches = [move for move in matches if move[3] == tuple(positions[1:])]
+
+        if len(matches) != 1:
+            raise ValueError("{} isn't a legal move (or is ambiguous) in this position.".format(token))
+
+        move = matches[0]
+        board.make_legal_move(move)
+        game["moves"].append({"position_to": move[1], "position_from": move[0], "eats_piece": move[2], "path": move[3]})
+        turn = "B" if turn == "W" else "W"
+
+    return game
+
+def read_pdn(path, color_up="W"):
+    # Yields the games of a PDN file one at a time. Each game ends with its result (1-0, 0-1, 1/2-1/2 or *).
+    lines = []
+
+    with open(path) as file:
+        for line in file:
+            lines.append(line)
+
+            if re.search(r"(^|\s)(1-0|0-1|1/2-1/2|\*|2-0|0-2|1-1)\s*$", line) and not line.lstrip().startswith("["):
+                yield from_pdn("".join(lines), color_up)
+                lines = []
+
+    if "".join(lines).strip():
+        yield from_pdn("".join(lines), color_up)
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Converts game records to PDN and back.")
+    parser.add_argument("conversion", choices=["to-pdn", "from-pdn"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    if args.conversion == "to-pdn":
+        with open(args.output, "w") as output_file:
+            for game in read_games(args.input):
+                output_file.write(to_pdn(game) + "\n")
+    else:
+        writer = GameWriter(args.output)
+
+        for game in read_pdn(args.input):
+            writer.write_game(game)
+
+        writer.close()
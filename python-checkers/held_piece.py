@@ -6,11 +6,16 @@ class HeldPiece:
         self.draw_rect = self.surface.get_rect()
         self.offset = offset
 
-    def draw_piece(self, display_surface):
+    def get_rect(self):
+        return self.draw_rect
+
+    def get_rect_on_mouse(self):
+        # Returns the rect the piece would be drawn on, following the mouse.
         mouse_pos = get_mouse_pos()
-        self.draw_rect.x = mouse_pos[0] + self.offset[0]
-        self.draw_rect.y = mouse_pos[1] + self.offset[1]
+        return self.draw_rect.move(mouse_pos[0] + self.offset[0] - self.draw_rect.x, mouse_pos[1] + self.offset[1] - self.draw_rect.y)
 
+    def draw_piece(self, display_surface):
+        self.draw_rect = self.get_rect_on_mouse()
         display_surface.blit(self.surface, self.draw_rect)
     
     def check_collision(self, rect_list):
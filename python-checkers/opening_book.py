@@ -0,0 +1,173 @@
+import os
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+from argparse import ArgumentParser
+from time import perf_counter
+from bitboard import JUMPED_SQUARES, rotate, get_canonical
+from zobrist import get_hash
+
+# Opening book: the best moves of the positions near the start of the game, found offline by deep searches.
+# The file has a header followed by entries sorted by position key, so a position is found by binary search
+# right on the memory-mapped file, without loading it. A position can have more than one entry when its best moves tie.
+# Positions are stored from the point of view of the side to move, as if it was white moving up the board,
+# so the book works for either color and whichever of them moves up.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening.book")
+DEFAULT_PLIES = 4
+DEFAULT_DEPTH = 8
+
+MAGIC = b"CKOB"
+VERSION = 1
+HEADER = Struct("<4sHI") # Magic, version and number of entries.
+ENTRY = Struct("<QBBI") # Position key, where the move starts, where it ends and the positions of the pieces it eats.
+
+def get_key(board, turn):
+    # Receives a BitBoard and the color to move, returns the key of the position in the book
+    # and whether the board had to be turned around to get it.
+    ours, theirs, kings = get_canonical(board.white, board.black, board.kings, board.color_up, turn)
+    return (get_hash(ours, theirs, kings), turn != board.color_up)
+
+def get_eaten_mask(move):
+    # Receives a move tuple of BitBoard.get_legal_moves(), returns a bitboard of the pieces it eats.
+    # Together with where it starts and ends, it tells apart multi-jumps that take different paths.
+    mask = 0
+    position = move[0]
+
+    for landing in move[3]:
+        jumped = JUMPED_SQUARES[position].get(landing)
+
+        if jumped is not None:
+            mask |= 1 << jumped
+
+        position = landing
+
+    return mask
+
+def turn_around(position_from, position_to, eaten_mask):
+    # Returns the same move on the board turned around. Turning it twice gives back the original move.
+    return (31 - position_from, 31 - position_to, rotate(eaten_mask))
+
+class OpeningBook:
+    def __init__(self, path):
+        # Maps the file into memory: entries are only read from disk when they're looked up.
+        self.file = open(path, "rb")
+        self.data = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self.data, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} isn't an opening book file of version {}.".format(path, VERSION))
+
+    def get_size(self):
+        return self.size
+
+    def get_entry(self, index):
+        return ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+
+    def get_moves(self, board, turn):
+        # Receives a BitBoard and the color to move, returns the book moves of the position as BitBoard.get_legal_moves() tuples.
+        # Returns an empty list if the position isn't in the book.
+        key, turned = get_key(board, turn)
+        low = 0
+        high = self.size
+
+        # Finds the first entry of the position.
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.get_entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        book_moves = set()
+
+        while low < self.size:
+            entry_key, position_from, position_to, eaten_mask = self.get_entry(low)
+
+            if entry_key != key:
+                break
+
+            book_moves.add(turn_around(position_from, position_to, eaten_mask) if turned else (position_from, position_to, eaten_mask))
+            low += 1
+
+        if len(book_moves) == 0:
+            return []
+
+        # Only legal moves are returned, in case two positions ever share a key.
+        return [move for move in board.get_legal_moves(turn) if (move[0], move[1], get_eaten_mask(move)) in book_moves]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+# Books already opened by open_opening_book(), by path.
+open_books = {}
+
+def open_opening_book(path=DEFAULT_PATH):
+    # Returns the OpeningBook in the given file, opened the first time it's needed in each process, or None if the file doesn't exist.
+    if path not in open_books:
+        open_books[path] = OpeningBook(path) if os.path.exists(path) else None
+
+    return open_books[path]
+
+def build(plies=DEFAULT_PLIES, depth=DEFAULT_DEPTH, path=DEFAULT_PATH, verbose=False):
+    # Searches every position reachable in fewer than 'plies' moves from the start, depth moves deep, and writes their best moves to the book.
+    # Both colors' moves are stored, so the book is used whichever color the AI plays.
+    from board import Board, get_start_pieces
+    from ai import AI
+
+    ais = {"W": AI("W", depth, use_book=False), "B": AI("B", depth, use_book=False)}
+    board = Board(get_start_pieces(), "W")
+    entries = {} # Key of each position searched, with its best moves as (position_from, position_to, eaten mask) tuples.
+    plies_searched = {} # Key of each position searched, with how many more moves were searched from it.
+    start_time = perf_counter()
+
+    def add_position(turn, plies_left):
+        key, turned = get_key(board.get_bitboard(), turn)
+
+        # Positions reached through different move orders are only searched once.
+        if plies_searched.get(key, 0) >= plies_left:
+            return
+
+        if key not in entries:
+            best_moves, _ = ais[turn].get_best_moves(board)
+
+            if best_moves is None:
+                # The side to move has no moves, so there's nothing to store or to play from here.
+                return
+
+            moves = [(move[0], move[1], get_eaten_mask(move)) for move in best_moves]
+            entries[key] = [turn_around(*move) for move in moves] if turned else moves
+
+            if verbose and len(entries) % 100 == 0:
+                print("{} positions searched in {:.1f} s".format(len(entries), perf_counter() - start_time))
+
+        plies_searched[key] = plies_left
+
+        if plies_left == 1:
+            return
+
+        for move in board.legal_moves(turn):
+            records = board.make_legal_move(move)
+            add_position("B" if turn == "W" else "W", plies_left - 1)
+            board.unmake_legal_move(records)
+
+    add_position("W", plies)
+    rows = sorted((key,) + move for key, moves in entries.items() for move in moves)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(rows)))
+
+        for row in rows:
+            file.write(ENTRY.pack(*row))
+
+    if verbose:
+        print("Saved {} moves of {} positions to {}".format(len(rows), len(entries), path))
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Builds the opening book used by the AI.")
+    parser.add_argument("--plies", type=int, default=DEFAULT_PLIES, help="moves from the start (counting both players) covered by the book")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="depth each position is searched to")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+    build(args.plies, args.depth, args.output, verbose=True)
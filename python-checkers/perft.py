@@ -0,0 +1,108 @@
+from sys import exit
+from argparse import ArgumentParser
+from time import perf_counter
+from board import Board, get_start_pieces
+from piece import Piece
+
+# Positions perft is checked on: (name, white, black, kings, color_up, turn, {depth: leaf nodes}).
+# Counts of the start position match the published ones for checkers. The others were recorded from perft() itself;
+# up to depth 5, test_perft.py checks them against a separate move generator that works on rows and columns instead of bitboards.
+TEST_POSITIONS = [
+    ("start", 0xFFF00000, 0x00000FFF, 0x0, "W", "W", {1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768, 7: 179740, 8: 845931}),
+    ("start, black moving up", 0x00000FFF, 0xFFF00000, 0x0, "B", "B", {1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768}),
+    ("quadruple jump", 0xFC230000, 0x00805A79, 0x0, "W", "W", {1: 1, 2: 7, 3: 56, 4: 304, 5: 2068, 6: 10841}),
+    ("kings and men", 0xEE420200, 0x00808135, 0x00000200, "W", "B", {1: 2, 2: 5, 3: 22, 4: 99, 5: 556, 6: 2728}),
+    ("king endgame", 0x00010040, 0x68100200, 0x68100040, "W", "W", {1: 5, 2: 45, 3: 164, 4: 1367, 5: 4904, 6: 44568}),
+]
+
+# Leaf nodes per second the perft benchmark has to reach on TEST_POSITIONS, so a slower move generator fails loudly.
+MIN_NODES_PER_SECOND = 50000
+
+def perft(board, turn, depth):
+    # Receives a BitBoard, returns the number of positions reached after depth moves (a multi-jump is a single move).
+    # Every move is made on the bitboard and unmade afterwards, so it ends up as it started.
+    if depth == 0:
+        return 1
+
+    moves = board.get_legal_moves(turn)
+
+    if depth == 1:
+        return len(moves)
+
+    next_turn = "B" if turn == "W" else "W"
+    nodes = 0
+
+    for move in moves:
+        records = board.make_legal_move(move)
+        nodes += perft(board, next_turn, depth - 1)
+        board.unmake_legal_move(records)
+
+    return nodes
+
+def perft_board(board, turn, depth):
+    # Same as perft(), but receives a Board and moves its pieces with make_legal_move() and unmake_legal_move(), like the game does.
+    if depth == 0:
+        return 1
+
+    next_turn = "B" if turn == "W" else "W"
+    nodes = 0
+
+    for move in board.legal_moves(turn):
+        records = board.make_legal_move(move)
+        nodes += perft_board(board, next_turn, depth - 1)
+        board.unmake_legal_move(records)
+
+    return nodes
+
+def get_test_board(white, black, kings, color_up):
+    # Returns a Board with the pieces of the given bitboards.
+    pieces = []
+
+    for position in range(32):
+        if (white | black) >> position & 1:
+            pieces.append(Piece(str(position) + ("W" if white >> position & 1 else "B") + ("Y" if kings >> position & 1 else "N")))
+
+    return Board(pieces, color_up)
+
+def get_start_board():
+    # Returns the Board a new game starts with, white moving up.
+    return Board(get_start_pieces(), "W")
+
+def run_perft(depth, use_board=False):
+    # Counts the positions of every test position up to depth, checking them against the stored counts.
+    # Returns a list of (name, depth, nodes, expected nodes or None, seconds) tuples.
+    results = []
+
+    for name, white, black, kings, color_up, turn, expected in TEST_POSITIONS:
+        board = get_test_board(white, black, kings, color_up)
+
+        for current_depth in range(1, depth + 1):
+            start_time = perf_counter()
+
+            if use_board:
+                nodes = perft_board(board, turn, current_depth)
+            else:
+                nodes = perft(board.get_bitboard(), turn, current_depth)
+
+            results.append((name, current_depth, nodes, expected.get(current_depth), perf_counter() - start_time))
+
+    return results
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Counts the positions reachable from test positions to check and measure move generation.")
+    parser.add_argument("depth", type=int, nargs="?", default=6)
+    parser.add_argument("--board", action="store_true", help="move pieces with Board.move_piece() instead of the bitboard")
+    args = parser.parse_args()
+    total_nodes = 0
+    total_time = 0
+    failed = False
+
+    for name, depth, nodes, expected, seconds in run_perft(args.depth, args.board):
+        status = "" if expected is None else (" ok" if nodes == expected else " MISMATCH, expected {}".format(expected))
+        failed = failed or (expected is not None and nodes != expected)
+        total_nodes += nodes
+        total_time += seconds
+        print("{:<24} depth {:<3} {:>10} nodes {:>12.0f} nodes/s{}".format(name, depth, nodes, nodes / seconds if seconds > 0 else 0, status))
+
+    print("Total: {} nodes in {:.2f} s ({:.0f} nodes/s)".format(total_nodes, total_time, total_nodes / total_time if total_time > 0 else 0))
+    exit(1 if failed else 0)
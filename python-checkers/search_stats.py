@@ -0,0 +1,108 @@
+from time import perf_counter
+from cProfile import Profile
+from pstats import Stats
+
+class SearchStats:
+    def __init__(self):
+        # Statistics of one AI.get_move() call, returned along with the move by AI.get_move_with_stats().
+        self.nodes = 0 # Positions searched, counting the ones searched by other processes.
+        self.leaf_evaluations = 0 # Positions scored by AI.get_value().
+        self.cutoffs = 0 # Times a position stopped searching its moves because alpha reached beta.
+        self.table_cutoffs = 0 # Positions whose score was taken from the transposition table without searching them.
+        self.tablebase_hits = 0 # Positions whose score was taken from the endgame tablebase.
+        self.table_probes = 0
+        self.table_hits = 0
+        self.depths = [] # (depth, seconds, nodes) of every depth searched completely, in order.
+        self.time = 0 # Seconds the whole call took.
+        self.book_move = False # True if the move came from the opening book, without searching.
+        self.pondered_depth = 0 # Depth the position had already been searched to by AI.ponder(), or 0 if it wasn't.
+
+    def get_depth(self):
+        # Returns the deepest depth searched completely, or 0 if none was (the move was forced).
+        return self.depths[-1][0] if len(self.depths) != 0 else 0
+
+    def get_table_hit_rate(self):
+        return self.table_hits / self.table_probes if self.table_probes != 0 else 0
+
+    def get_effective_branching_factor(self):
+        # Returns b such that b ** depth equals the nodes searched by the deepest depth searched completely, or 0 if there's none.
+        # The lower it is, the more alpha-beta and the transposition table are pruning.
+        if len(self.depths) == 0 or self.depths[-1][2] == 0:
+            return 0
+
+        depth, _, nodes = self.depths[-1]
+        return nodes ** (1 / depth)
+
+    def add_depth(self, depth, seconds, nodes):
+        self.depths.append((depth, seconds, nodes))
+
+    def to_dict(self):
+        # Returns the statistics as a dict, e.g. to be saved as JSON.
+        return {
+            "nodes": self.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "cutoffs": self.cutoffs,
+            "table_cutoffs": self.table_cutoffs,
+            "tablebase_hits": self.tablebase_hits,
+            "table_probes": self.table_probes,
+            "table_hits": self.table_hits,
+            "table_hit_rate": self.get_table_hit_rate(),
+            "depth": self.get_depth(),
+            "depths": [{"depth": depth, "seconds": seconds, "nodes": nodes} for depth, seconds, nodes in self.depths],
+            "effective_branching_factor": self.get_effective_branching_factor(),
+            "time": self.time,
+            "book_move": self.book_move,
+            "pondered_depth": self.pondered_depth
+        }
+
+class SearchProfiler:
+    def __init__(self, use_cprofile=False):
+        # Given to AI.set_profiler(), times move generation, evaluation and board copying during its searches.
+        # If use_cprofile is True, every search is also run under cProfile, which is slower but shows every function.
+        # Only the searches of the AI's own process are measured, not the ones of its parallel workers.
+        self.times = {} # Seconds spent on each part, by name.
+        self.calls = {} # Calls of each part, by name.
+        self.profile = Profile() if use_cprofile else None
+
+    def wrap(self, name, function):
+        # Returns a function that calls the given one and adds the time it took to the part with the given name.
+        self.times.setdefault(name, 0)
+        self.calls.setdefault(name, 0)
+
+        def timed_function(*args):
+            start_time = perf_counter()
+            result = function(*args)
+            self.times[name] += perf_counter() - start_time
+            self.calls[name] += 1
+            return result
+
+        return timed_function
+
+    def instrument_board(self, board):
+        # Times the move generation of a BitBoard, by replacing its methods on that instance only.
+        board.get_legal_moves = self.wrap("move generation", board.get_legal_moves)
+        return board
+
+    def copy_board(self, board):
+        # Returns a copy of the BitBoard, timing the copy.
+        return self.wrap("board copy", board.copy)()
+
+    def start(self):
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+
+    def get_report(self):
+        # Returns a dict with the seconds and calls of every timed part.
+        return {name: {"seconds": self.times[name], "calls": self.calls[name]} for name in self.times}
+
+    def print_report(self, limit=20):
+        # Prints the timed parts and, if cProfile is used, its limit most expensive functions.
+        for name, report in self.get_report().items():
+            print("{:<16} {:>10.4f} s {:>10} calls".format(name, report["seconds"], report["calls"]))
+
+        if self.profile is not None:
+            Stats(self.profile).sort_stats("cumulative").print_stats(limit)
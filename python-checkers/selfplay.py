@@ -0,0 +1,97 @@
+import json
+import random
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from board import Board, get_start_pieces
+from ai import AI
+from game_record import GameWriter, get_start_game
+
+# A game that goes on for this many moves (counting both players) is called a draw.
+MAX_PLIES = 200
+
+# AIs used by each process, created by init_selfplay_process() when the process starts.
+process_ais = None
+
+def init_selfplay_process(config_a, config_b, max_plies):
+    # Every config is a (depth, time_ms) pair. Each AI is created once per process and color, so its transposition table is reused between games.
+    global process_ais
+    process_ais = {
+        "a": {color: AI(color, config_a[0]) for color in ("W", "B")},
+        "b": {color: AI(color, config_b[0]) for color in ("W", "B")},
+        "time_ms": {"a": config_a[1], "b": config_b[1]},
+        "max_plies": max_plies
+    }
+
+def play_game(game_number, seed):
+    # Plays one game between configs "a" and "b" in this process. They swap colors every game and white moves first.
+    # Returns a dict with the game number, who played white, the winning config (or None for a draw), the plies played,
+    # the milliseconds each move took and the moves themselves.
+    random.seed(seed)
+    white = "a" if game_number % 2 == 0 else "b"
+    players = {"W": white, "B": "b" if white == "a" else "a"}
+    board = Board(get_start_pieces(), "W")
+    turn = "W"
+    winner = None
+    move_times = []
+    moves = []
+
+    while len(move_times) < process_ais["max_plies"]:
+        if board.get_winner(turn) is not None:
+            # A side that can't move loses.
+            winner = players[board.get_winner(turn)]
+            break
+
+        player = players[turn]
+        start_time = perf_counter()
+        move = process_ais[player][turn].get_move(board, process_ais["time_ms"][player])
+        move_times.append(round((perf_counter() - start_time) * 1000, 3))
+        moves.append(move)
+        board.make_legal_move(move)
+
+        if board.get_winner() is not None:
+            winner = players[board.get_winner()]
+            break
+
+        turn = "B" if turn == "W" else "W"
+
+    return {"game": game_number, "white": white, "winner": winner, "plies": len(move_times), "move_times": move_times, "moves": moves}
+
+def run_selfplay(games, workers, config_a, config_b, output_path, max_plies=MAX_PLIES, seed=0, record_path=None):
+    # Plays games between two AI configs, each a (depth, time_ms) pair, on 'workers' processes.
+    # Every result is written to output_path as a line of JSON as soon as its game ends.
+    # If record_path is given, the moves of every game are also written there as a game record (see game_record.py).
+    # Returns a dict with the games played, games per second and the win rate of each config.
+    wins = {"a": 0, "b": 0, None: 0}
+    start_time = perf_counter()
+    writer = None if record_path is None else GameWriter(record_path)
+
+    with open(output_path, "w") as output_file:
+        with ProcessPoolExecutor(workers, get_context("spawn"), init_selfplay_process, (config_a, config_b, max_plies)) as pool:
+            futures = [pool.submit(play_game, game_number, seed + game_number) for game_number in range(games)]
+
+            for future in as_completed(futures):
+                result = future.result()
+                wins[result["winner"]] += 1
+                moves = result.pop("moves")
+
+                if writer is not None:
+                    game = get_start_game()
+                    game["winner"] = None if result["winner"] is None else ("W" if result["winner"] == result["white"] else "B")
+                    game["moves"] = moves
+                    writer.write_game(game)
+                output_file.write(json.dumps(result) + "\n")
+                output_file.flush()
+
+    if writer is not None:
+        writer.close()
+
+    elapsed = perf_counter() - start_time
+
+    return {
+        "games": games,
+        "games_per_second": games / elapsed if elapsed > 0 else 0,
+        "a_win_rate": wins["a"] / games if games != 0 else 0,
+        "b_win_rate": wins["b"] / games if games != 0 else 0,
+        "draw_rate": wins[None] / games if games != 0 else 0
+    }
@@ -0,0 +1,276 @@
+import os
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+from math import comb
+from itertools import combinations
+from argparse import ArgumentParser
+from time import perf_counter
+from bitboard import BitBoard, rotate, get_canonical
+
+# Endgame tablebase: the result of every position with few pieces, found by retrograde analysis and saved to a file.
+# Positions are stored from the point of view of the side to move, turned so that side is white and moves up the board.
+# Each position takes one byte: 0 if it's a draw (neither side can force a win), otherwise the number of moves
+# (counting both players) until the losing side is left without moves, plus 1. An odd number of moves is a win for the side to move.
+
+# Results returned by Tablebase.probe(), for the side to move.
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.tb")
+DEFAULT_MAX_PIECES = 4
+
+MAGIC = b"CKTB"
+VERSION = 1
+HEADER = Struct("<4sHBH") # Magic, version, most pieces of a position and number of material signatures.
+SIGNATURE_ENTRY = Struct("<4BII") # Our men, our kings, their men, their kings, offset of its positions in the file and how many there are.
+
+def get_signature(ours, theirs, kings):
+    # Returns the (our men, our kings, their men, their kings) counts of a canonical position.
+    our_kings = (ours & kings).bit_count()
+    their_kings = (theirs & kings).bit_count()
+    return (ours.bit_count() - our_kings, our_kings, theirs.bit_count() - their_kings, their_kings)
+
+def get_swapped_signature(signature):
+    # Returns the signature of the positions reached by a move that neither eats nor crowns, where the other side moves next.
+    return (signature[2], signature[3], signature[0], signature[1])
+
+def get_signature_size(signature):
+    # Our men never stand on the top row and theirs never on the bottom one, so each has 28 squares to choose from.
+    # Kings take squares not used by men. Positions where both sides' men would share a square are left unused.
+    our_men, our_kings, their_men, their_kings = signature
+    free_squares = 32 - our_men - their_men
+    return comb(28, our_men) * comb(28, their_men) * comb(free_squares, our_kings) * comb(free_squares - our_kings, their_kings)
+
+def get_rank(bits, excluded, first):
+    # Returns the rank of the squares in bits among every set of as many squares that are >= first and not in excluded.
+    rank = 0
+    count = 1
+
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        place = bit.bit_length() - 1 - first - (excluded & (bit - 1)).bit_count()
+        rank += comb(place, count)
+        count += 1
+
+    return rank
+
+def get_index(ours, theirs, kings, signature):
+    # Returns the place of a canonical position among the positions of its signature.
+    our_men, our_kings, their_men, their_kings = signature
+    free_squares = 32 - our_men - their_men
+    men = (ours | theirs) & ~kings
+    index = get_rank(ours & ~kings, 0, 4) * comb(28, their_men) + get_rank(theirs & ~kings, 0, 0)
+    index = index * comb(free_squares, our_kings) + get_rank(ours & kings, men, 0)
+    return index * comb(free_squares - our_kings, their_kings) + get_rank(theirs & kings, men | (ours & kings), 0)
+
+def get_solving_order(max_pieces):
+    # Returns every signature with up to max_pieces pieces and at least one on each side, in the order they can be solved:
+    # eating lowers the number of pieces and crowning lowers the number of men, so positions only lead to ones solved before,
+    # or to ones of the swapped signature, solved along with them.
+    signatures = []
+
+    for pieces in range(2, max_pieces + 1):
+        for men in range(pieces + 1):
+            for our_pieces in range(1, pieces):
+                for our_men in range(max(0, men - (pieces - our_pieces)), min(men, our_pieces) + 1):
+                    signatures.append((our_men, our_pieces - our_men, men - our_men, pieces - our_pieces - (men - our_men)))
+
+    return signatures
+
+def get_positions(signature):
+    # Yields every canonical (ours, theirs, kings) position of the signature.
+    our_men, our_kings, their_men, their_kings = signature
+
+    for our_men_squares in combinations(range(4, 32), our_men):
+        our_men_bits = sum(1 << square for square in our_men_squares)
+
+        for their_men_squares in combinations(range(0, 28), their_men):
+            their_men_bits = sum(1 << square for square in their_men_squares)
+
+            if our_men_bits & their_men_bits:
+                continue
+
+            free_squares = [square for square in range(32) if not (our_men_bits | their_men_bits) >> square & 1]
+
+            for our_kings_squares in combinations(free_squares, our_kings):
+                our_kings_bits = sum(1 << square for square in our_kings_squares)
+
+                for their_kings_squares in combinations([square for square in free_squares if not our_kings_bits >> square & 1], their_kings):
+                    their_kings_bits = sum(1 << square for square in their_kings_squares)
+                    yield (our_men_bits | our_kings_bits, their_men_bits | their_kings_bits, our_kings_bits | their_kings_bits)
+
+def solve_signatures(signatures, tables):
+    # Finds the result of every position of the given signatures, which only lead to each other or to signatures in tables.
+    # Adds a bytearray with the results of each signature to tables.
+    # Every move of every position is made once to link it to the positions it leads to, then results spread backwards from
+    # the positions that are already decided, one move at a time, so each one gets the shortest win or longest loss.
+    offsets = {}
+    size = 0
+
+    for signature in signatures:
+        offsets[signature] = size
+        size += get_signature_size(signature)
+
+    values = bytearray(size)
+    moves_left = [0] * size # Moves of each position that lead to a win of the other side are discounted from it.
+    parents = {} # Positions of these signatures that lead to each one.
+    events = {} # events[distance] lists (position, result of the position it leads to) pairs, for results decided at that distance.
+    resolved = {} # resolved[distance] lists the positions of these signatures decided at that distance.
+
+    for signature in signatures:
+        for ours, theirs, kings in get_positions(signature):
+            node = offsets[signature] + get_index(ours, theirs, kings, signature)
+            board = BitBoard(ours, theirs, kings, "W", 0)
+            moves = board.get_legal_moves("W")
+
+            if len(moves) == 0:
+                resolved.setdefault(0, []).append(node)
+                values[node] = 1
+                continue
+
+            moves_left[node] = len(moves)
+
+            for move in moves:
+                records = board.make_legal_move(move)
+                child = (rotate(board.black), rotate(board.white), rotate(board.kings))
+                board.unmake_legal_move(records)
+
+                if child[0] == 0:
+                    # Every piece of the other side was eaten.
+                    events.setdefault(0, []).append((node, LOSS))
+                    continue
+
+                child_signature = get_signature(*child)
+                child_index = get_index(*child, child_signature)
+
+                if child_signature in offsets:
+                    parents.setdefault(offsets[child_signature] + child_index, []).append(node)
+                    continue
+
+                value = tables[child_signature][child_index]
+
+                if value != 0:
+                    events.setdefault(value - 1, []).append((node, WIN if (value - 1) % 2 == 1 else LOSS))
+
+    distance = 0
+
+    while len(events) != 0 or len(resolved) != 0:
+        layer = events.pop(distance, [])
+
+        for child in resolved.pop(distance, []):
+            result = WIN if distance % 2 == 1 else LOSS
+            layer.extend((node, result) for node in parents.get(child, ()))
+
+        for node, child_result in layer:
+            if values[node] != 0:
+                continue
+
+            if child_result == WIN:
+                moves_left[node] -= 1
+
+                if moves_left[node] != 0:
+                    continue
+
+            # Either the move leads to a position lost by the other side, or every move leads to a win of the other side.
+            if distance + 2 > 255:
+                raise OverflowError("A distance to win doesn't fit in one byte.")
+
+            values[node] = distance + 2
+            resolved.setdefault(distance + 1, []).append(node)
+
+        distance += 1
+
+    for signature in signatures:
+        offset = offsets[signature]
+        tables[signature] = values[offset:offset + get_signature_size(signature)]
+
+def generate(max_pieces=DEFAULT_MAX_PIECES, path=DEFAULT_PATH, verbose=False):
+    # Solves every position with up to max_pieces pieces and writes the tablebase file.
+    tables = {}
+    signatures = get_solving_order(max_pieces)
+
+    for signature in signatures:
+        if signature in tables:
+            continue
+
+        start_time = perf_counter()
+        swapped = get_swapped_signature(signature)
+        solve_signatures([signature] if swapped == signature else [signature, swapped], tables)
+
+        if verbose:
+            print("Solved {} and {} in {:.2f} s".format(signature, swapped, perf_counter() - start_time))
+
+    with open(path, "wb") as file:
+        offset = HEADER.size + SIGNATURE_ENTRY.size * len(signatures)
+        file.write(HEADER.pack(MAGIC, VERSION, max_pieces, len(signatures)))
+
+        for signature in signatures:
+            file.write(SIGNATURE_ENTRY.pack(*signature, offset, len(tables[signature])))
+            offset += len(tables[signature])
+
+        for signature in signatures:
+            file.write(tables[signature])
+
+class Tablebase:
+    def __init__(self, path):
+        # Maps the file into memory: positions are only read from disk when they're probed.
+        self.file = open(path, "rb")
+        self.data = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        magic, version, self.max_pieces, signature_count = HEADER.unpack_from(self.data, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} isn't a tablebase file of version {}.".format(path, VERSION))
+
+        self.offsets = {}
+
+        for entry in range(signature_count):
+            our_men, our_kings, their_men, their_kings, offset, _ = SIGNATURE_ENTRY.unpack_from(self.data, HEADER.size + entry * SIGNATURE_ENTRY.size)
+            self.offsets[(our_men, our_kings, their_men, their_kings)] = offset
+
+    def get_max_pieces(self):
+        return self.max_pieces
+
+    def probe(self, board, turn):
+        # Receives a BitBoard and the color to move, returns a (result, moves) tuple for the side to move, where result is
+        # WIN, LOSS or DRAW and moves is how many moves (counting both players) the game lasts with perfect play.
+        # Returns None if the position has too many pieces.
+        ours, theirs, kings = get_canonical(board.white, board.black, board.kings, board.color_up, turn)
+
+        if ours == 0:
+            return (LOSS, 0)
+
+        signature = get_signature(ours, theirs, kings)
+        offset = self.offsets.get(signature)
+
+        if offset is None:
+            return None
+
+        value = self.data[offset + get_index(ours, theirs, kings, signature)]
+
+        if value == 0:
+            return (DRAW, 0)
+
+        return (WIN if (value - 1) % 2 == 1 else LOSS, value - 1)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+# Tablebases already opened by open_tablebase(), by path.
+open_tablebases = {}
+
+def open_tablebase(path=DEFAULT_PATH):
+    # Returns the Tablebase in the given file, opened once per process, or None if the file doesn't exist.
+    if path not in open_tablebases:
+        open_tablebases[path] = Tablebase(path) if os.path.exists(path) else None
+
+    return open_tablebases[path]
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Generates the endgame tablebase used by the AI.")
+    parser.add_argument("pieces", type=int, nargs="?", default=DEFAULT_MAX_PIECES, help="most pieces of the positions solved")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+    generate(args.pieces, args.output, verbose=True)
@@ -0,0 +1,95 @@
+import random
+import pytest
+from bitboard import BitBoard
+from game_record import GameWriter, read_games, encode_moves, decode_moves, to_pdn, from_pdn, get_start_game
+
+# Position where white's only move is a quadruple jump (see perft.TEST_POSITIONS).
+QUADRUPLE_JUMP = {"white": 0xFC230000, "black": 0x00805A79, "kings": 0, "color_up": "W", "turn": "W", "winner": None, "moves": []}
+
+def play_random_game(game, seed, max_plies=200):
+    # Plays random legal moves from the start position of the game dict, filling in its moves and winner.
+    rng = random.Random(seed)
+    board = BitBoard(game["white"], game["black"], game["kings"], game["color_up"])
+    turn = game["turn"]
+
+    for _ in range(max_plies):
+        game["winner"] = board.get_winner(turn)
+
+        if game["winner"] is not None:
+            break
+
+        move = rng.choice(board.get_legal_moves(turn))
+        board.make_legal_move(move)
+        game["moves"].append({"position_to": move[1], "position_from": move[0], "eats_piece": move[2], "path": move[3]})
+        turn = "B" if turn == "W" else "W"
+
+    return game
+
+def get_test_games():
+    # Returns random games from the start position with either color moving up, and from a position with a quadruple jump.
+    games = [play_random_game(get_start_game(), seed) for seed in range(10)]
+
+    for seed in range(5):
+        game = get_start_game()
+        game.update(color_up="B", white=game["black"], black=game["white"])
+        games.append(play_random_game(game, seed))
+
+    games.append(play_random_game(dict(QUADRUPLE_JUMP, moves=[]), 0))
+    return games
+
+def test_games_have_multi_jumps():
+    # The other tests only cover multi-jumps if the test games have some.
+    assert any(len(move["path"]) > 1 for game in get_test_games() for move in game["moves"])
+    assert len(get_test_games()[-1]["moves"][0]["path"]) == 4
+
+def test_encode_decode():
+    for game in get_test_games():
+        assert decode_moves(encode_moves(game["moves"]), len(game["moves"])) == game["moves"]
+
+def test_writer_round_trip(tmp_path):
+    games = get_test_games()
+    writer = GameWriter(tmp_path / "games.rec")
+
+    for game in games:
+        writer.write_game(game)
+
+    writer.close()
+    assert list(read_games(tmp_path / "games.rec")) == games
+
+def test_pdn_round_trip(tmp_path):
+    # Games converted to PDN and back are the same, and so is the file they're written to.
+    games = get_test_games()
+    paths = (tmp_path / "games.rec", tmp_path / "from_pdn.rec")
+
+    for path, written_games in zip(paths, (games, [from_pdn(to_pdn(game), game["color_up"]) for game in games])):
+        writer = GameWriter(path)
+
+        for game in written_games:
+            writer.write_game(game)
+
+        writer.close()
+
+    assert list(read_games(paths[1])) == games
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+
+def test_pdn_short_jumps():
+    # A multi-jump written only with the squares it starts and ends on gets its whole path.
+    game = play_random_game(dict(QUADRUPLE_JUMP, moves=[]), 0, max_plies=1)
+    pdn = to_pdn(game)
+    squares = pdn.split()[-2].split("x")
+    short_pdn = pdn.replace("x".join(squares), squares[0] + "x" + squares[-1])
+    assert from_pdn(short_pdn)["moves"] == game["moves"]
+
+def test_pdn_results():
+    game = play_random_game(dict(QUADRUPLE_JUMP, moves=[]), 0, max_plies=1)
+    pdn = to_pdn(game)
+
+    for result, winner in (("1-0", "W"), ("2-0", "W"), ("0-1", "B"), ("0-2", "B"), ("1/2-1/2", None), ("1-1", None)):
+        assert from_pdn(pdn.replace("1/2-1/2", result))["winner"] == winner, result
+
+    # Unfinished games can't be recorded as a draw.
+    with pytest.raises(ValueError):
+        from_pdn(pdn.replace("1/2-1/2", "*"))
+
+    with pytest.raises(ValueError):
+        from_pdn("1. 9-13 22-18")
@@ -0,0 +1,147 @@
+from time import perf_counter
+from bitboard import BitBoard
+from perft import TEST_POSITIONS, MIN_NODES_PER_SECOND, perft, perft_board, get_test_board, get_start_board
+
+# Deepest count of TEST_POSITIONS checked with reference_perft(), which is much slower than perft().
+REFERENCE_MAX_DEPTH = 5
+
+def get_square(position):
+    # Receives a position (0-31), returns its (row, column) on the 8x8 board.
+    row = position // 4
+    return (row, position % 4 * 2 + row % 2)
+
+def get_jumped(position, landing):
+    # Returns the position between the two positions of a jump.
+    (row, column), (landing_row, landing_column) = get_square(position), get_square(landing)
+    return (row + landing_row) // 2 * 4 + (column + landing_column) // 2 // 2
+
+def get_reference_directions(color, is_king, color_up):
+    # Returns the (row, column) steps a piece can move in. Men only move towards the row they're crowned on.
+    forward = -1 if color == color_up else 1
+    directions = [(forward, -1), (forward, 1)]
+    return directions + [(-forward, -1), (-forward, 1)] if is_king else directions
+
+def add_reference_jumps(pieces, color_up, position_from, position, path, moves):
+    # Appends to moves every (position_from, path) jump the piece on position can finish, eating and crowning as it goes.
+    color, is_king = pieces[position]
+    row, column = get_square(position)
+    jumped = False
+
+    for row_step, column_step in get_reference_directions(color, is_king, color_up):
+        landing_row, landing_column = row + 2 * row_step, column + 2 * column_step
+
+        if not (0 <= landing_row < 8 and 0 <= landing_column < 8):
+            continue
+
+        eaten = (row + row_step) * 4 + (column + column_step) // 2
+        landing = landing_row * 4 + landing_column // 2
+
+        if landing in pieces or eaten not in pieces or pieces[eaten][0] == color:
+            continue
+
+        jumped = True
+        eaten_piece = pieces.pop(eaten)
+        del pieces[position]
+        pieces[landing] = (color, is_king or landing_row == (0 if color == color_up else 7))
+        add_reference_jumps(pieces, color_up, position_from, landing, path + (landing,), moves)
+        del pieces[landing]
+        pieces[position] = (color, is_king)
+        pieces[eaten] = eaten_piece
+
+    if not jumped and len(path) != 0:
+        moves.append((position_from, path))
+
+def get_reference_moves(pieces, color, color_up):
+    # Receives a dict with the (color, is king) of the piece on each position, returns the legal moves of color as (position_from, path) tuples.
+    # Jumps are forced and a multi-jump is a single move, like BitBoard.get_legal_moves(), but found square by square.
+    moves = []
+
+    for position in [position for position in pieces if pieces[position][0] == color]:
+        add_reference_jumps(pieces, color_up, position, position, (), moves)
+
+    if len(moves) != 0:
+        return moves
+
+    for position, (piece_color, is_king) in pieces.items():
+        if piece_color != color:
+            continue
+
+        row, column = get_square(position)
+
+        for row_step, column_step in get_reference_directions(color, is_king, color_up):
+            if 0 <= row + row_step < 8 and 0 <= column + column_step < 8:
+                landing = (row + row_step) * 4 + (column + column_step) // 2
+
+                if landing not in pieces:
+                    moves.append((position, (landing,)))
+
+    return moves
+
+def reference_perft(pieces, color, color_up, depth):
+    # Same as perft(), but on a dict of pieces with get_reference_moves().
+    if depth == 0:
+        return 1
+
+    nodes = 0
+
+    for position_from, path in get_reference_moves(pieces, color, color_up):
+        next_pieces = dict(pieces)
+        position = position_from
+
+        for landing in path:
+            piece_color, is_king = next_pieces.pop(position)
+
+            if abs(landing // 4 - position // 4) == 2:
+                next_pieces.pop(get_jumped(position, landing))
+
+            next_pieces[landing] = (piece_color, is_king or landing // 4 == (0 if piece_color == color_up else 7))
+            position = landing
+
+        nodes += reference_perft(next_pieces, "B" if color == "W" else "W", color_up, depth - 1)
+
+    return nodes
+
+def test_start_position():
+    board = get_start_board()
+
+    for depth in range(1, 7):
+        assert perft(board.get_bitboard(), "W", depth) == TEST_POSITIONS[0][6][depth]
+
+def test_stored_positions():
+    for name, white, black, kings, color_up, turn, expected in TEST_POSITIONS:
+        board = get_test_board(white, black, kings, color_up).get_bitboard()
+
+        for depth, nodes in expected.items():
+            if depth <= 6:
+                assert perft(board, turn, depth) == nodes, name
+
+def test_reference_counts():
+    # The stored counts have to match a move generator that doesn't use bitboards.
+    for name, white, black, kings, color_up, turn, expected in TEST_POSITIONS:
+        pieces = {}
+
+        for position in range(32):
+            if (white | black) >> position & 1:
+                pieces[position] = ("W" if white >> position & 1 else "B", kings >> position & 1 == 1)
+
+        for depth, nodes in expected.items():
+            if depth <= REFERENCE_MAX_DEPTH:
+                assert reference_perft(pieces, turn, color_up, depth) == nodes, name
+
+def test_board_matches_bitboard():
+    # Board.move_piece() and undo_move() have to agree with the bitboard and leave the board as it was.
+    for name, white, black, kings, color_up, turn, expected in TEST_POSITIONS:
+        board = get_test_board(white, black, kings, color_up)
+        pieces = [piece.get_name() for piece in board.get_pieces()]
+
+        assert perft_board(board, turn, 3) == perft(board.get_bitboard(), turn, 3), name
+        assert [piece.get_name() for piece in board.get_pieces()] == pieces, name
+
+def test_nodes_per_second():
+    nodes = 0
+    start_time = perf_counter()
+
+    for name, white, black, kings, color_up, turn, expected in TEST_POSITIONS:
+        nodes += perft(BitBoard(white, black, kings, color_up), turn, 6)
+
+    assert nodes / (perf_counter() - start_time) >= MIN_NODES_PER_SECOND
@@ -0,0 +1,88 @@
+import pytest
+from bitboard import BitBoard
+from tablebase import generate, Tablebase, get_solving_order, get_positions, get_index, get_signature_size, WIN, DRAW, LOSS
+
+# Positions the tests look up in a tablebase of up to 3 pieces: (name, white, black, kings, result and moves for white to move).
+# White moves up the board. The ones decided within a few moves are also checked with solve_by_search().
+TEST_POSITIONS = (
+    ("king against king", 1 << 13, 1 << 31, 1 << 13 | 1 << 31, (DRAW, 0)),
+    ("king eats the last piece", 1 << 13, 1 << 9, 1 << 13 | 1 << 9, (WIN, 1)),
+    ("man with no moves", 1 << 8, 1 << 4 | 1 << 1, 0, (LOSS, 0)),
+    ("two kings against a king", 1 << 0 | 1 << 1, 1 << 8, 1 << 0 | 1 << 1 | 1 << 8, (WIN, 5)),
+    ("king against two kings", 1 << 1, 1 << 4 | 1 << 8, 1 << 1 | 1 << 4 | 1 << 8, (LOSS, 4)),
+    ("two kings that can't trap a king", 1 << 0 | 1 << 1, 1 << 9, 1 << 0 | 1 << 1 | 1 << 9, (DRAW, 0))
+)
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    # Tablebase of up to 3 pieces, generated once for every test of this module.
+    path = tmp_path_factory.mktemp("tablebase") / "endgame.tb"
+    generate(3, str(path))
+    tablebase = Tablebase(str(path))
+    yield tablebase
+    tablebase.close()
+
+def solve_by_search(board, turn, plies):
+    # Returns the (result, moves) of a BitBoard for the color to move found by searching every move up to plies moves ahead,
+    # without the tablebase, or None if it isn't decided within that many moves.
+    moves = board.get_legal_moves(turn)
+
+    if len(moves) == 0:
+        return (LOSS, 0)
+
+    if plies == 0:
+        return None
+
+    next_turn = "B" if turn == "W" else "W"
+    results = []
+
+    for move in moves:
+        records = board.make_legal_move(move)
+        results.append((LOSS, 0) if board.get_side(next_turn) == 0 else solve_by_search(board, next_turn, plies - 1))
+        board.unmake_legal_move(records)
+
+    return get_result_of_children(results)
+
+def get_result_of_children(results):
+    # Receives the (result, moves) of the positions every move leads to, for the other side (or None if unknown),
+    # returns the result of the position: the quickest win if a move leaves the other side lost, otherwise
+    # the slowest loss if every move leaves it winning, otherwise None if any is unknown or a draw.
+    losses = [result[1] for result in results if result is not None and result[0] == LOSS]
+
+    if len(losses) != 0:
+        return (WIN, min(losses) + 1)
+
+    if all(result is not None and result[0] == WIN for result in results):
+        return (LOSS, max(result[1] for result in results) + 1)
+
+    return None
+
+def test_indices():
+    # Every position of a signature has its own index within the size of the signature.
+    for signature in get_solving_order(3):
+        indices = [get_index(ours, theirs, kings, signature) for ours, theirs, kings in get_positions(signature)]
+        assert len(set(indices)) == len(indices) and 0 <= min(indices) and max(indices) < get_signature_size(signature), signature
+
+def test_known_positions(tablebase):
+    for name, white, black, kings, expected in TEST_POSITIONS:
+        assert tablebase.probe(BitBoard(white, black, kings, "W"), "W") == expected, name
+        # The same position with the colors swapped and black moving up.
+        assert tablebase.probe(BitBoard(black, white, kings, "B"), "B") == expected, name
+
+        if expected[0] != DRAW:
+            assert solve_by_search(BitBoard(white, black, kings, "W"), "W", expected[1]) == expected, name
+
+def test_results_follow_from_moves(tablebase):
+    # Each position's result has to follow from the results of the positions its moves lead to.
+    for signature in get_solving_order(2) + [(0, 2, 0, 1), (0, 1, 0, 2)]:
+        for ours, theirs, kings in get_positions(signature):
+            board = BitBoard(ours, theirs, kings, "W")
+            results = []
+
+            for move in board.get_legal_moves("W"):
+                records = board.make_legal_move(move)
+                results.append(tablebase.probe(board, "B"))
+                board.unmake_legal_move(records)
+
+            result = (LOSS, 0) if len(results) == 0 else get_result_of_children(results)
+            assert tablebase.probe(board, "W") == ((DRAW, 0) if result is None else result), (signature, ours, theirs, kings)
@@ -0,0 +1,84 @@
+from array import array
+
+# Bound types of a stored score.
+EXACT = 0
+LOWER_BOUND = 1 # The real score is at least the stored one (the search was cut off by beta).
+UPPER_BOUND = 2 # The real score is at most the stored one (no move reached alpha).
+
+# Bytes used by one entry: key (8), depth (1), bound (1), score (2), move (2) and generation (1).
+ENTRY_SIZE = 15
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        # The table never grows past size_mb megabytes: it is allocated once, with fixed-size arrays.
+        # Entries are grouped in buckets of two slots. The first slot keeps the deepest search of the positions that land on it
+        # and the second one always takes the newest entry, so deep results survive while recent ones are still kept.
+        # Entries left over from older searches (see new_search()) are replaced first.
+        slots = 2
+
+        while (slots * 2) * ENTRY_SIZE <= size_mb * 1024 * 1024:
+            slots *= 2
+
+        self.bucket_mask = slots // 2 - 1
+        self.keys = array('Q', bytes(8 * slots))
+        self.depths = array('b', bytes(slots))
+        self.bounds = array('b', bytes(slots))
+        self.scores = array('h', bytes(2 * slots))
+        self.moves = array('H', bytes(2 * slots)) # 0 means no move, otherwise (position_from * 32 + position_to + 1).
+        self.generations = array('B', bytes(slots))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def get_size(self):
+        # Returns how many entries the table can hold.
+        return len(self.keys)
+
+    def new_search(self):
+        # Called once per search, so entries stored by previous ones can be told apart and replaced first.
+        self.generation = (self.generation + 1) % 256
+
+    def get_hit_rate(self):
+        # Returns the fraction of probes that found their position, or 0 if there weren't any.
+        return self.hits / self.probes if self.probes != 0 else 0
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        # Receives a position key, returns a (depth, bound, score, move) tuple if the position is stored, otherwise None.
+        # move is a (position_from, position_to, eats_piece) tuple, or None. Only where a move starts and ends is stored.
+        self.probes += 1
+        slot = (key & self.bucket_mask) * 2
+
+        if self.keys[slot] != key:
+            slot += 1
+
+            if self.keys[slot] != key:
+                return None
+
+        self.hits += 1
+        return (self.depths[slot], self.bounds[slot], self.scores[slot], self.decode_move(self.moves[slot]))
+
+    def store(self, key, depth, bound, score, move):
+        # Stores the result of searching a position, following the replacement policy described in __init__.
+        slot = (key & self.bucket_mask) * 2
+
+        if self.keys[slot] != key and self.generations[slot] == self.generation and self.depths[slot] > depth:
+            # The deeper entry stays and this one goes to the always-replace slot.
+            slot += 1
+
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.scores[slot] = score
+        self.moves[slot] = 0 if move is None else move[0] * 32 + move[1] + 1 # Any path a multi-jump took is dropped.
+        self.generations[slot] = self.generation
+
+    def decode_move(self, code):
+        if code == 0:
+            return None
+
+        position_from, position_to = divmod(code - 1, 32)
+        return (position_from, position_to, abs(position_to - position_from) in (7, 9))
@@ -0,0 +1,32 @@
+from random import Random
+
+# Random 64-bit keys used to hash positions (Zobrist hashing).
+# A position's hash is the XOR of the keys of every piece on it, so moving a piece only needs a couple of XORs to update it.
+# The generator is seeded so hashes are the same on every run, which lets them be stored in files.
+_random = Random(20240101)
+
+# PIECE_KEYS[kind][position], where kind is 0 for white men, 1 for white kings, 2 for black men and 3 for black kings.
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(32)] for _ in range(4)]
+
+# XORed into a position's hash when black is the one to move.
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+
+def get_kind(is_white, is_king):
+    # Returns the index of PIECE_KEYS used for a piece of the given color and type.
+    return (0 if is_white else 2) + (1 if is_king else 0)
+
+def get_hash(white, black, kings):
+    # Receives the three bitboards of a position, returns its hash computed from scratch.
+    position_hash = 0
+
+    for position in range(32):
+        bit = 1 << position
+
+        if (white | black) & bit:
+            position_hash ^= PIECE_KEYS[get_kind(white & bit != 0, kings & bit != 0)][position]
+
+    return position_hash
+
+def get_turn_hash(position_hash, turn):
+    # Receives a position's hash and the color to move, returns a hash that also tells whose turn it is.
+    return position_hash ^ BLACK_TO_MOVE_KEY if turn == "B" else position_hash